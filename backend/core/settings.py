@@ -61,6 +61,7 @@ SPECTACULAR_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    "deployments.middleware.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -160,5 +161,57 @@ CORS_ALLOW_CREDENTIALS = True
 CELERY_TIMEZONE = "UTC"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+# Tasks de deploy usam acks_late: a mensagem só pode voltar para a fila depois
+# do time limit, senão outro worker pegaria um deploy ainda em execução
+CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 2 * CELERY_TASK_TIME_LIMIT}
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379")
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379")
+CELERY_BEAT_SCHEDULE = {
+    "rollup-deploy-stats": {
+        "task": "deployments.tasks.rollup_deploy_stats_task",
+        "schedule": float(os.getenv("DEPLOY_STATS_ROLLUP_INTERVAL", "60")),
+    },
+}
+# Deploys vão para a fila deploy.<provider>; com DEPLOY_PROVIDER_QUEUES=0 tudo
+# fica na fila padrão (um único worker atende todos os providers)
+CELERY_TASK_ROUTES = ("deployments.routing.route_task",)
+DEPLOY_PROVIDER_QUEUES = os.getenv("DEPLOY_PROVIDER_QUEUES", "1") == "1"
+
+# Deploys em lote: quantos deploys de um mesmo lote rodam ao mesmo tempo em
+# cada provider
+DEPLOY_BATCH_CONCURRENCY = {
+    "aws": int(os.getenv("DEPLOY_BATCH_CONCURRENCY_AWS", "4")),
+    "oracle": int(os.getenv("DEPLOY_BATCH_CONCURRENCY_ORACLE", "4")),
+}
+DEPLOY_BATCH_MAX_SIZE = int(os.getenv("DEPLOY_BATCH_MAX_SIZE", "200"))
+
+# Retries de um deploy interrompido pelo time limit ou pela perda do worker
+# (continuam do checkpoint)
+DEPLOY_TASK_MAX_RETRIES = int(os.getenv("DEPLOY_TASK_MAX_RETRIES", "3"))
+
+# Um deploy novo cancela os deploys em andamento do mesmo repositório e ref nos
+# mesmos providers
+DEPLOY_SUPERSEDE = os.getenv("DEPLOY_SUPERSEDE", "1") == "1"
+
+# Webhook de push do GitHub: pushes no mesmo branch dentro da janela de
+# debounce viram um único deploy, adiado no máximo DEPLOY_WEBHOOK_MAX_WAIT
+GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET", "")
+DEPLOY_WEBHOOK_DEBOUNCE = int(os.getenv("DEPLOY_WEBHOOK_DEBOUNCE", "60"))
+DEPLOY_WEBHOOK_MAX_WAIT = int(os.getenv("DEPLOY_WEBHOOK_MAX_WAIT", "300"))
+
+# Limites compartilhados entre os workers (0 = sem limite): deploys simultâneos
+# e chamadas por segundo às APIs, por provider e por conta de cloud
+DEPLOY_PROVIDER_LIMITS = {
+    "aws": {
+        "concurrency": int(os.getenv("DEPLOY_CONCURRENCY_AWS", "0")),
+        "api_rate": float(os.getenv("DEPLOY_API_RATE_AWS", "0")),
+    },
+    "oracle": {
+        "concurrency": int(os.getenv("DEPLOY_CONCURRENCY_ORACLE", "0")),
+        "api_rate": float(os.getenv("DEPLOY_API_RATE_ORACLE", "0")),
+    },
+}
+DEPLOY_ACCOUNT_CONCURRENCY = int(os.getenv("DEPLOY_ACCOUNT_CONCURRENCY", "0"))
+DEPLOY_ACCOUNT_API_RATE = float(os.getenv("DEPLOY_ACCOUNT_API_RATE", "0"))
+# Vazio (como no .env.template) também usa o broker
+DEPLOY_LIMITS_REDIS_URL = os.getenv("DEPLOY_LIMITS_REDIS_URL") or CELERY_BROKER_URL
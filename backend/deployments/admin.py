@@ -1,6 +1,14 @@
 from django.contrib import admin
 
-from .models import Deploy, Log, Provider
+from .models import (
+    Deploy,
+    DeployBatch,
+    DeployStatRollup,
+    Log,
+    PendingRedeploy,
+    Provider,
+)
+from .search import search_logs
 
 
 @admin.register(Provider)
@@ -22,6 +30,7 @@ class DeployAdmin(admin.ModelAdmin):
     list_display = (
         "id",
         "github_repo_url",
+        "batch",
         "created_at",
         "updated_at",
         "completed_at",
@@ -34,3 +43,39 @@ class LogAdmin(admin.ModelAdmin):
     list_display = ("id", "deploy", "provider", "level", "timestamp", "message")
     search_fields = ("message",)
     list_filter = ("level", "provider")
+
+    def get_search_results(self, request, queryset, search_term):
+        # Usa o índice full-text em vez de um LIKE '%...%' na tabela inteira
+        return search_logs(search_term, queryset), False
+
+
+@admin.register(DeployBatch)
+class DeployBatchAdmin(admin.ModelAdmin):
+    list_display = ("id", "created_at")
+
+
+@admin.register(PendingRedeploy)
+class PendingRedeployAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "github_repo_url",
+        "branch",
+        "commit_sha",
+        "pushes",
+        "due_at",
+    )
+
+
+@admin.register(DeployStatRollup)
+class DeployStatRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "period",
+        "bucket_start",
+        "provider",
+        "started",
+        "succeeded",
+        "failed",
+        "mean_duration",
+        "p95_duration",
+    )
+    list_filter = ("period", "provider")
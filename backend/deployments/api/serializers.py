@@ -1,6 +1,28 @@
-from deployments.models import Deploy, Log, Provider
+import re
+
+from deployments.deployers.registry import provider_slugs
+from deployments.models import Deploy, DeployBatch, DeployStatRollup, Log, Provider
+from django.conf import settings
 from rest_framework import serializers
 
+# Regras do `git check-ref-format`; o ref vai direto para o `git fetch`, então
+# um valor começando com "-" não pode virar opção
+INVALID_REF = re.compile(
+    r"^[-/.]|[\x00-\x20\x7f~^:?*\[\\]|\.\.|@\{|//|/\.|[/.]$|\.lock(?:/|$)"
+)
+# O servidor só aceita `git fetch` de um commit pelo SHA completo
+ABBREVIATED_SHA = re.compile(r"[0-9a-f]{4,39}", re.IGNORECASE)
+
+
+def validate_git_ref(value: str) -> str:
+    if value and (value == "@" or INVALID_REF.search(value)):
+        raise serializers.ValidationError("Invalid git ref")
+    if ABBREVIATED_SHA.fullmatch(value):
+        raise serializers.ValidationError(
+            "Abbreviated commit SHAs can't be fetched; use the full 40-character SHA"
+        )
+    return value
+
 
 class ProviderSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,6 +33,10 @@ class ProviderSerializer(serializers.ModelSerializer):
             "status",
             "created_at",
             "updated_at",
+            "finished_at",
+            "cancel_requested_at",
+            "queued_at",
+            "started_at",
         ]
 
 
@@ -22,6 +48,8 @@ class DeploySerializer(serializers.ModelSerializer):
         fields = [
             "id",
             "github_repo_url",
+            "ref",
+            "commit_sha",
             "providers",
             "created_at",
             "updated_at",
@@ -30,11 +58,57 @@ class DeploySerializer(serializers.ModelSerializer):
 
 
 class DeployCreateSerializer(serializers.ModelSerializer):
-    providers = serializers.ListField(child=serializers.CharField(), write_only=True)
+    providers = serializers.ListField(
+        child=serializers.ChoiceField(choices=provider_slugs()), write_only=True
+    )
 
     class Meta:
         model = Deploy
-        fields = ["github_repo_url", "providers"]
+        fields = ["github_repo_url", "ref", "providers"]
+
+    def validate_ref(self, value):
+        return validate_git_ref(value)
+
+
+class DeployCancelSerializer(serializers.Serializer):
+    # Vazio cancela todos os providers do deploy
+    providers = serializers.ListField(
+        child=serializers.CharField(), required=False, default=list
+    )
+
+
+class DeployBatchEntrySerializer(serializers.ModelSerializer):
+    providers = serializers.ListField(
+        child=serializers.ChoiceField(choices=provider_slugs()),
+        allow_empty=False,
+    )
+
+    class Meta:
+        model = Deploy
+        fields = ["github_repo_url", "ref", "providers"]
+
+    def validate_ref(self, value):
+        return validate_git_ref(value)
+
+
+class DeployBatchCreateSerializer(serializers.Serializer):
+    deployments = DeployBatchEntrySerializer(
+        many=True, allow_empty=False, max_length=settings.DEPLOY_BATCH_MAX_SIZE
+    )
+
+
+class DeployBatchSerializer(serializers.ModelSerializer):
+    deploys = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    summary = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DeployBatch
+        fields = ["id", "created_at", "deploys", "summary"]
+
+    def get_summary(self, batch):
+        from deployments.services import batch_summary
+
+        return batch_summary(batch)
 
 
 class LogSerializer(serializers.ModelSerializer):
@@ -43,3 +117,18 @@ class LogSerializer(serializers.ModelSerializer):
     class Meta:
         model = Log
         fields = ["id", "deploy", "provider", "message", "level", "timestamp"]
+
+
+class DeployStatRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeployStatRollup
+        fields = [
+            "period",
+            "bucket_start",
+            "provider",
+            "started",
+            "succeeded",
+            "failed",
+            "mean_duration",
+            "p95_duration",
+        ]
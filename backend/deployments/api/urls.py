@@ -1,17 +1,35 @@
 from django.urls import path
 
 from .views import (
+    DeployBatchCreateView,
+    DeployBatchDetailView,
+    DeployCancelView,
     DeployDetailView,
     DeployListCreateView,
+    DeployStatsView,
+    GitHubWebhookView,
     LogListView,
+    LogSearchView,
     ProviderListView,
 )
 
 urlpatterns = [
     path("deployments/", DeployListCreateView.as_view(), name="deploy-list-create"),
     path("deployments/<int:pk>/", DeployDetailView.as_view(), name="deploy-detail"),
+    path(
+        "deployments/<int:pk>/cancel/", DeployCancelView.as_view(), name="deploy-cancel"
+    ),
     path(
         "deployments/<int:deploy_id>/logs/", LogListView.as_view(), name="deploy-logs"
     ),
+    path("deployments/batch/", DeployBatchCreateView.as_view(), name="deploy-batch"),
+    path(
+        "deployments/batch/<int:pk>/",
+        DeployBatchDetailView.as_view(),
+        name="deploy-batch-detail",
+    ),
+    path("webhooks/github/", GitHubWebhookView.as_view(), name="github-webhook"),
+    path("logs/search/", LogSearchView.as_view(), name="log-search"),
+    path("stats/", DeployStatsView.as_view(), name="deploy-stats"),
     path("providers/", ProviderListView.as_view(), name="provider-list"),
 ]
@@ -1,6 +1,5 @@
-from deployments.models import Deploy, Log, Provider
+from deployments.models import Deploy, DeployBatch, DeployStatRollup, Log, Provider
 from django.shortcuts import get_object_or_404
-from pydantic_ai import Agent
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -8,13 +7,20 @@ from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.conf import settings
+from django.utils.dateparse import parse_datetime
 import json
 import os
+import re
 import logging
+from functools import cache
 
 from .serializers import (
+    DeployBatchCreateSerializer,
+    DeployBatchSerializer,
+    DeployCancelSerializer,
     DeployCreateSerializer,
     DeploySerializer,
+    DeployStatRollupSerializer,
     LogSerializer,
     ProviderSerializer,
 )
@@ -22,9 +28,7 @@ from .serializers import (
 # Configurar logging
 logger = logging.getLogger(__name__)
 
-agent = Agent(
-    model="openai:gpt-4o-mini",
-    instructions="""
+AGENT_INSTRUCTIONS = """
     Você é um especialista em infraestrutura cloud que analisa deployments e recomenda 
     o melhor provedor baseado em dados técnicos e requisitos específicos.
     
@@ -36,8 +40,16 @@ agent = Agent(
     - Confiabilidade e SLA
     
     Forneça uma resposta estruturada com justificativa clara.
-    """,
-)
+    """
+
+
+@cache
+def get_agent():
+    # pydantic_ai (e o client da OpenAI) só são importados no primeiro uso, não
+    # no boot de cada processo web/worker
+    from pydantic_ai import Agent
+
+    return Agent(model="openai:gpt-4o-mini", instructions=AGENT_INSTRUCTIONS)
 
 
 class DeployListCreateView(APIView):
@@ -51,13 +63,12 @@ class DeployListCreateView(APIView):
         if serializer.is_valid():
             github_repo_url = serializer.validated_data["github_repo_url"]  # type: ignore
             provider_slugs = serializer.validated_data["providers"]  # type: ignore
-            deploy = Deploy.objects.create(github_repo_url=github_repo_url)
+            ref = serializer.validated_data.get("ref", "")  # type: ignore
 
-            # Dispara tasks assíncronas para cada provider
-            from deployments.tasks import deploy_to_provider_task
+            # Cria o deploy e dispara tasks assíncronas para cada provider
+            from deployments.services import create_deploy
 
-            for provider_slug in provider_slugs:
-                deploy_to_provider_task.delay(deploy.pk, provider_slug)  # type: ignore
+            deploy = create_deploy(github_repo_url, provider_slugs, ref=ref)
 
             return Response(
                 DeploySerializer(deploy).data, status=status.HTTP_201_CREATED
@@ -72,6 +83,134 @@ class DeployDetailView(APIView):
         return Response(serializer.data)
 
 
+class DeployCancelView(APIView):
+    """
+    Pede o cancelamento dos providers em andamento do deploy (todos, ou só os
+    listados em `providers`). O worker para no próximo limite de fase.
+    """
+
+    def post(self, request, pk):
+        deploy = get_object_or_404(Deploy, pk=pk)
+        serializer = DeployCancelSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        from deployments.services import request_cancel
+
+        providers = deploy.providers.all()  # type: ignore
+        if serializer.validated_data["providers"]:  # type: ignore
+            providers = providers.filter(
+                slug__in=serializer.validated_data["providers"]  # type: ignore
+            )
+        request_cancel(providers, "requested via API")
+        deploy.refresh_from_db()
+        return Response(DeploySerializer(deploy).data, status=status.HTTP_202_ACCEPTED)
+
+
+class DeployBatchCreateView(APIView):
+    def post(self, request):
+        serializer = DeployBatchCreateSerializer(data=request.data)
+        if serializer.is_valid():
+            from deployments.services import create_batch
+
+            batch = create_batch(serializer.validated_data["deployments"])  # type: ignore
+            return Response(
+                DeployBatchSerializer(batch).data, status=status.HTTP_201_CREATED
+            )
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class DeployBatchDetailView(APIView):
+    def get(self, request, pk):
+        batch = get_object_or_404(DeployBatch, pk=pk)
+        serializer = DeployBatchSerializer(batch)
+        return Response(serializer.data)
+
+
+class GitHubWebhookView(APIView):
+    """
+    Recebe eventos de push do GitHub e agenda o redeploy do branch nos mesmos
+    providers do último deploy dele. Rajadas de pushes viram um único deploy.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request):
+        from deployments.metrics import GITHUB_WEBHOOK_EVENTS
+        from deployments.services import (
+            cancel_redeploy,
+            last_deploy_for_branch,
+            queue_redeploy,
+            repository_urls,
+            verify_github_signature,
+        )
+
+        event = request.headers.get("X-GitHub-Event", "")
+        if not verify_github_signature(
+            settings.GITHUB_WEBHOOK_SECRET,
+            request.body,
+            request.headers.get("X-Hub-Signature-256", ""),
+        ):
+            GITHUB_WEBHOOK_EVENTS.labels(event=event, outcome="forbidden").inc()
+            return Response(
+                {"detail": "Invalid signature"}, status=status.HTTP_403_FORBIDDEN
+            )
+
+        def ignored(reason):
+            GITHUB_WEBHOOK_EVENTS.labels(event=event, outcome="ignored").inc()
+            return Response({"detail": reason}, status=status.HTTP_202_ACCEPTED)
+
+        if event == "ping":
+            GITHUB_WEBHOOK_EVENTS.labels(event=event, outcome="ok").inc()
+            return Response({"detail": "pong"})
+        if event != "push":
+            return ignored(f"Event {event!r} is not handled")
+
+        try:
+            payload = json.loads(request.body)
+            ref = payload["ref"]
+            commit_sha = payload["after"]
+            repository = payload["repository"]
+            if not all(isinstance(value, str) for value in (ref, commit_sha)):
+                raise TypeError("ref and after must be strings")
+            if not isinstance(repository, dict) or not isinstance(
+                repository.get("html_url"), str
+            ):
+                raise TypeError("repository must have an html_url")
+            urls = repository_urls(repository)
+            default_branch = repository.get("default_branch") or ""
+        except (ValueError, KeyError, TypeError, AttributeError):
+            GITHUB_WEBHOOK_EVENTS.labels(event=event, outcome="invalid").inc()
+            return Response(
+                {"detail": "Invalid push payload"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ref.startswith("refs/heads/"):
+            return ignored("Only branch pushes trigger deploys")
+        branch = ref.removeprefix("refs/heads/")
+
+        deploy = last_deploy_for_branch(urls, branch, default_branch)
+        if deploy is None:
+            return ignored(f"No deploys of branch {branch!r} for this repository")
+        if payload.get("deleted"):
+            cancel_redeploy(deploy.github_repo_url, branch)
+            return ignored(f"Branch {branch!r} was deleted")
+
+        providers = list(deploy.providers.values_list("slug", flat=True))  # type: ignore
+        pending = queue_redeploy(deploy.github_repo_url, branch, commit_sha, providers)
+        GITHUB_WEBHOOK_EVENTS.labels(event=event, outcome="queued").inc()
+        return Response(
+            {
+                "branch": branch,
+                "commit_sha": pending.commit_sha,
+                "providers": pending.providers,
+                "pushes": pending.pushes,
+                "due_at": pending.due_at,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
 class LogListView(APIView):
     def get(self, request, deploy_id):
         logs = Log.objects.filter(deploy_id=deploy_id)
@@ -86,6 +225,51 @@ class LogListView(APIView):
         return Response(serializer.data)
 
 
+class LogSearchView(APIView):
+    """
+    Busca full-text nos logs. Parâmetros: q, deploy, provider, level, since e
+    until (ISO 8601) e limit (padrão 100, máximo 1000). Mais recentes primeiro.
+    """
+
+    def get(self, request):
+        from deployments.search import search_logs
+
+        logs = Log.objects.select_related("provider")
+        deploy_id = request.GET.get("deploy")
+        # isdigit() também aceita dígitos Unicode ("²"), que quebram no ORM
+        if deploy_id and not re.fullmatch(r"\d+", deploy_id, re.ASCII):
+            return Response(
+                {"deploy": "Must be an integer"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        filters = {
+            "deploy_id": deploy_id,
+            "provider__slug": request.GET.get("provider"),
+            "level": request.GET.get("level"),
+        }
+        logs = logs.filter(**{key: value for key, value in filters.items() if value})
+        for param, lookup in (("since", "timestamp__gte"), ("until", "timestamp__lte")):
+            if request.GET.get(param):
+                value = parse_datetime(request.GET[param])
+                if value is None:
+                    return Response(
+                        {param: "Invalid datetime"}, status=status.HTTP_400_BAD_REQUEST
+                    )
+                logs = logs.filter(**{lookup: value})
+        try:
+            limit = min(int(request.GET.get("limit", 100)), 1000)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return Response(
+                {"limit": "Must be a positive integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        logs = search_logs(request.GET.get("q", ""), logs).order_by("-timestamp")
+        serializer = LogSerializer(logs[:limit], many=True)
+        return Response(serializer.data)
+
+
 class ProviderListView(APIView):
     def get(self, request):
         # Agora providers são específicos por deploy
@@ -98,6 +282,37 @@ class ProviderListView(APIView):
         return Response(serializer.data)
 
 
+class DeployStatsView(APIView):
+    """
+    Rollups pré-calculadas por provider. Parâmetros: period (hour ou day,
+    padrão hour), provider, since e until (ISO 8601, início do bucket).
+    """
+
+    def get(self, request):
+        period = request.GET.get("period", "hour")
+        if period not in dict(DeployStatRollup.PERIOD_CHOICES):
+            return Response(
+                {"period": "Must be hour or day"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        rollups = DeployStatRollup.objects.filter(period=period)
+        if request.GET.get("provider"):
+            rollups = rollups.filter(provider=request.GET["provider"])
+        for param, lookup in (
+            ("since", "bucket_start__gte"),
+            ("until", "bucket_start__lte"),
+        ):
+            if request.GET.get(param):
+                value = parse_datetime(request.GET[param])
+                if value is None:
+                    return Response(
+                        {param: "Invalid datetime"}, status=status.HTTP_400_BAD_REQUEST
+                    )
+                rollups = rollups.filter(**{lookup: value})
+        rollups = rollups.order_by("bucket_start", "provider")
+        serializer = DeployStatRollupSerializer(rollups, many=True)
+        return Response(serializer.data)
+
+
 class DeploymentAIView(APIView):
     def get(self, request, deploy_id):
         deploy = get_object_or_404(Deploy, pk=deploy_id)
@@ -117,7 +332,7 @@ class DeploymentAIView(APIView):
         Leve em consideração fatores como latência, custo, recursos disponíveis e localização.
         """
         
-        result = agent.run_sync(prompt)
+        result = get_agent().run_sync(prompt)
         return Response({
             "result": result.output,
             "cloud_data_used": cloud_data
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DeploymentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'deployments'
+
+    def ready(self):
+        # Registra os sinais do Celery usados pelas métricas
+        from deployments import metrics  # noqa: F401
@@ -0,0 +1,7 @@
+"""
+Benchmarks offline do pipeline de deploy.
+
+Os deployers reais rodam contra substitutos locais das clouds (moto para
+S3/CloudFormation, um client OCI falso e um `docker compose convert` falso),
+então dá para medir throughput e regressões sem credenciais.
+"""
@@ -0,0 +1,57 @@
+import os
+import random
+import subprocess
+from pathlib import Path
+
+COMPOSE_FILE = """services:
+  web:
+    build: .
+    ports:
+      - "8000:8000"
+"""
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "benchmark",
+    "GIT_AUTHOR_EMAIL": "benchmark@example.com",
+    "GIT_COMMITTER_NAME": "benchmark",
+    "GIT_COMMITTER_EMAIL": "benchmark@example.com",
+}
+
+
+def generate_repository(
+    path: Path,
+    files: int = 200,
+    file_size: int = 4096,
+    dirs: int = 10,
+    commits: int = 1,
+    seed: int = 0,
+) -> str:
+    """
+    Cria um repositório git em `path` com um docker-compose.yml e `files`
+    arquivos de texto de ~`file_size` bytes distribuídos em `dirs` pastas.
+    Com `commits` > 1 os arquivos são reescritos a cada commit para gerar
+    histórico. Retorna uma URL file:// (força o transporte do git em vez da
+    cópia local por hardlinks, mais próximo de um clone remoto).
+    """
+    rng = random.Random(seed)
+    path.mkdir(parents=True, exist_ok=True)
+    env = {**os.environ, **GIT_ENV}
+
+    def git(*args):
+        subprocess.check_call(
+            ["git", *args], cwd=path, env=env, stdout=subprocess.DEVNULL
+        )
+
+    git("init", "-q", "-b", "main")
+    (path / "docker-compose.yml").write_text(COMPOSE_FILE)
+
+    for commit in range(commits):
+        for i in range(files):
+            target = path / f"src{i % max(dirs, 1)}" / f"module_{i}.py"
+            target.parent.mkdir(exist_ok=True)
+            # Texto hexadecimal: compressível como código-fonte, mas não trivial
+            target.write_text(rng.randbytes(file_size // 2).hex())
+        git("add", "-A")
+        git("commit", "-q", "-m", f"benchmark commit {commit}")
+
+    return path.resolve().as_uri()
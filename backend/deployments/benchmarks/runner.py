@@ -0,0 +1,152 @@
+import json
+import resource
+import statistics
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from deployments.benchmarks.stubs import fake_docker, mocked_aws, stubbed_oci
+from deployments.deployers.factory import DeployerFactory
+from deployments.models import Deploy
+
+STUBS = {
+    "aws": mocked_aws,
+    "oracle": stubbed_oci,
+}
+
+
+class PeakRSSSampler:
+    """
+    Amostra o RSS do processo em background. ru_maxrss só informa o pico da
+    vida inteira do processo, o que não separa um provider do outro.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current_kb() -> int:
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        # Fora do Linux: melhor aproximação disponível
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self.current_kb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_kb = self.current_kb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, self.current_kb())
+
+
+def run_provider(provider_slug: str, repo_url: str, iterations: int, workdir: Path):
+    """
+    Executa `iterations` deploys completos do repositório num provider e
+    retorna as estatísticas por etapa. Deploys que falharam entram só em
+    `errors`: as etapas que pularam distorceriam as médias.
+    """
+    phases: dict[str, list[float]] = {}
+    errors = []
+
+    with ExitStack() as stack:
+        stack.enter_context(fake_docker(workdir / "bin"))
+        stack.enter_context(STUBS[provider_slug]())
+        sampler = stack.enter_context(PeakRSSSampler())
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            deploy = Deploy.objects.create(github_repo_url=repo_url)
+            deployer = DeployerFactory.create_deployer(provider_slug, deploy)
+            run_start = time.perf_counter()
+            try:
+                deployer.execute_deployment()
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            deployer.phase_timings["total"] = time.perf_counter() - run_start
+            for phase, elapsed in deployer.phase_timings.items():
+                phases.setdefault(phase, []).append(elapsed)
+        wall = time.perf_counter() - started
+
+    return {
+        "iterations": iterations,
+        "errors": errors,
+        "deploys_per_minute": iterations / wall * 60 if wall else 0.0,
+        "peak_rss_mb": round(sampler.peak_kb / 1024, 1),
+        "phases": {
+            phase: {
+                "mean": statistics.fmean(values),
+                "median": statistics.median(values),
+                "max": max(values),
+            }
+            for phase, values in phases.items()
+        },
+    }
+
+
+def mismatched_params(current: dict, baseline: dict) -> list[str]:
+    """Parâmetros da execução que diferem do baseline (comparação inválida)."""
+    before, after = baseline.get("params", {}), current["params"]
+    return [
+        f"{key}: {before.get(key)!r} -> {after.get(key)!r}"
+        for key in sorted(before.keys() | after.keys())
+        if before.get(key) != after.get(key)
+    ]
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta: float):
+    """
+    Lista as regressões em relação ao baseline: etapas cuja média ficou mais
+    de `tolerance` (fração) mais lenta, ignorando diferenças absolutas menores
+    que `min_delta` segundos, e quedas equivalentes de deploys/minuto.
+    """
+    regressions = []
+    for provider, result in current["providers"].items():
+        base = baseline.get("providers", {}).get(provider)
+        if not base:
+            continue
+        for phase, stats in result["phases"].items():
+            base_stats = base["phases"].get(phase)
+            if not base_stats:
+                continue
+            before, after = base_stats["mean"], stats["mean"]
+            if after > before * (1 + tolerance) and after - before > min_delta:
+                regressions.append(
+                    f"{provider}.{phase}: {before:.3f}s -> {after:.3f}s "
+                    f"(+{(after / before - 1) * 100:.0f}%)"
+                )
+        before, after = base["deploys_per_minute"], result["deploys_per_minute"]
+        if after < before * (1 - tolerance):
+            regressions.append(
+                f"{provider}.deploys_per_minute: {before:.1f} -> {after:.1f}"
+            )
+    return regressions
+
+
+def load_baseline(path: Path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: Path, results: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
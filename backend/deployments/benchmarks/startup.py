@@ -0,0 +1,58 @@
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# SDKs pesados: o ideal é que só sejam importados quando um deploy precisa deles
+HEAVY_MODULES = ("boto3", "botocore", "oci", "pydantic_ai", "openai")
+
+PREAMBLE = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+"""
+
+REPORT = """
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "modules": len(sys.modules),
+    "heavy": [m for m in %r if m in sys.modules],
+}))
+"""
+
+# O que cada processo carrega antes de atender a primeira requisição/task
+PROBES = {
+    # manage.py: setup do Django e resolução das URLs (importa todas as views)
+    "web": """
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+""",
+    # worker Celery: carrega a app e os módulos de tasks, como no boot do worker
+    "worker": """
+from core.celery import app
+app.loader.import_default_modules()
+""",
+}
+
+
+def measure(probe: str, runs: int, cwd: Path) -> dict:
+    """Roda o probe em `runs` interpretadores novos e resume os tempos."""
+    code = PREAMBLE + PROBES[probe] + REPORT % (HEAVY_MODULES,)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, "-c", code], cwd=cwd, text=True
+        )
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    seconds = [s["seconds"] for s in samples]
+    return {
+        "median": statistics.median(seconds),
+        "min": min(seconds),
+        "max": max(seconds),
+        "modules": samples[-1]["modules"],
+        "heavy": samples[-1]["heavy"],
+    }
@@ -0,0 +1,128 @@
+import os
+import stat
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+FAKE_DOCKER = """#!/bin/sh
+# Substituto de `docker compose -f <arquivo> convert -o <saida>`
+out=""
+while [ $# -gt 0 ]; do
+  if [ "$1" = "-o" ]; then
+    out="$2"
+    shift
+  fi
+  shift
+done
+cat > "$out" <<'TEMPLATE'
+AWSTemplateFormatVersion: "2010-09-09"
+Resources:
+  AppBucket:
+    Type: AWS::S3::Bucket
+TEMPLATE
+"""
+
+AWS_BUCKET = "benchmark-deploys"
+AWS_REGION = "us-east-1"
+
+
+@contextmanager
+def fake_docker(bin_dir: Path):
+    """Coloca um `docker` falso no início do PATH."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    docker = bin_dir / "docker"
+    docker.write_text(FAKE_DOCKER)
+    docker.chmod(docker.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    path = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    with mock.patch.dict(os.environ, {"PATH": path}):
+        yield
+
+
+@contextmanager
+def mocked_aws():
+    """S3 e CloudFormation em memória (moto), com o bucket de deploy criado."""
+    try:
+        from moto import mock_aws
+    except ImportError as e:
+        raise ImportError(
+            "moto is required for the AWS benchmark: "
+            "pip install 'moto[s3,cloudformation]'"
+        ) from e
+    import boto3
+
+    env = {
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": AWS_REGION,
+        "AWS_S3_BUCKET": AWS_BUCKET,
+    }
+    with mock.patch.dict(os.environ, env), mock_aws():
+        boto3.client("s3", region_name=AWS_REGION).create_bucket(Bucket=AWS_BUCKET)
+        yield
+
+
+class FakeObjectStorageClient:
+    """Guarda apenas o tamanho dos objetos enviados."""
+
+    objects: dict[str, int] = {}
+
+    def __init__(self, config, **kwargs):
+        self.config = config
+
+    def get_namespace(self, **kwargs):
+        return SimpleNamespace(data="benchmark")
+
+    def head_object(self, namespace_name, bucket_name, object_name, **kwargs):
+        import oci
+
+        if f"{bucket_name}/{object_name}" not in self.objects:
+            raise oci.exceptions.ServiceError(404, "ObjectNotFound", {}, "Not found")
+        return SimpleNamespace(status=200, headers={}, data=None)
+
+    def put_object(
+        self, namespace_name, bucket_name, object_name, put_object_body, **kwargs
+    ):
+        body = (
+            put_object_body.read()
+            if hasattr(put_object_body, "read")
+            else put_object_body
+        )
+        self.objects[f"{bucket_name}/{object_name}"] = len(body)
+        return SimpleNamespace(status=200, headers={}, data=None)
+
+
+class FakeResourceManagerClient:
+    stacks: list[str] = []
+
+    def __init__(self, config, **kwargs):
+        self.config = config
+
+    def create_stack(self, create_stack_details, **kwargs):
+        stack_id = f"ocid1.ormstack.benchmark.{len(self.stacks)}"
+        self.stacks.append(stack_id)
+        return SimpleNamespace(status=200, data=SimpleNamespace(id=stack_id))
+
+
+@contextmanager
+def stubbed_oci():
+    """Substitui a config e os clients da OCI usados pelo OracleDeployer."""
+    config = {"tenancy": "ocid1.tenancy.benchmark", "region": "sa-saopaulo-1"}
+    env = {
+        "OCI_BUCKET_NAME": "benchmark-deploys",
+        "OCI_COMPARTMENT_ID": "ocid1.compartment.benchmark",
+    }
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.dict(os.environ, env))
+        stack.enter_context(mock.patch("oci.config.from_file", return_value=config))
+        stack.enter_context(
+            mock.patch(
+                "oci.object_storage.ObjectStorageClient", FakeObjectStorageClient
+            )
+        )
+        stack.enter_context(
+            mock.patch(
+                "oci.resource_manager.ResourceManagerClient", FakeResourceManagerClient
+            )
+        )
+        yield
@@ -1,20 +1,26 @@
 import os
 import subprocess
-import zipfile
+from functools import cached_property
 from pathlib import Path
 
 import boto3
+from celery.exceptions import SoftTimeLimitExceeded
 
-from deployments.deployers.base import BaseDeployer
+from deployments.deployers.base import BaseDeployer, DeployCancelled
+from deployments.deployers.delta import S3BlobStore
+from deployments.deployers.packaging import file_digest
+from deployments.deployers.pipeline import Pipeline
+from deployments.metrics import instrument_boto3_client
+from deployments.throttling import account_key
 
 
 class AWSDeployer(BaseDeployer):
     """
     Deployer that:
-      1. Packages application into a ZIP
-      2. Uploads ZIP to S3
-      3. Converts docker-compose.yml to CloudFormation template
-      4. Creates or updates a CloudFormation stack
+      1. Packages application into a ZIP and uploads it to S3
+      2. Converts docker-compose.yml to a CloudFormation template and
+         validates it (concurrently with step 1)
+      3. Creates or updates a CloudFormation stack
     """
 
     def __init__(self, deploy):
@@ -25,53 +31,86 @@ class AWSDeployer(BaseDeployer):
             "aws_secret_access_key": os.getenv("AWS_SECRET_ACCESS_KEY"),
             "region_name": os.getenv("AWS_DEFAULT_REGION", "sa-east-1"),
         }
-        self.s3_client = boto3.client("s3", **aws_params)
-        self.cf_client = boto3.client("cloudformation", **aws_params)
+        self.region = aws_params["region_name"]
+        self.s3_client = self._client("s3", aws_params)
+        self.cf_client = self._client("cloudformation", aws_params)
         self.bucket = os.getenv("AWS_S3_BUCKET", "hackathon-itau")
 
     def get_provider_type(self) -> str:
         return "aws"
 
-    def deploy_to_cloud(self):
-        try:
-            # 1) Package and upload
-            zip_path = self._package_app()
-            s3_key = f"{self.deploy.pk}/app.zip"
-            self._upload_to_s3(zip_path, s3_key)
+    @cached_property
+    def account(self) -> str:
+        # API quotas are per account and region
+        return account_key(os.getenv("AWS_ACCESS_KEY_ID", ""), self.region)
 
-            # 2) Convert Compose to CloudFormation
-            cf_template = self._convert_compose()
+    def _client(self, service: str, params: dict):
+        # Throttled calls are retried by botocore with the shared backoff
+        # policy, on top of the client-side rate limits
+        client = boto3.client(service, config=self.backoff.botocore_config(), **params)
+        self.backoff.install_botocore_retries(client)
+        # Handlers run in registration order: throttle first, so the wait for
+        # a token isn't counted as API latency (same as OCI's api_call)
+        self._throttled(client)
+        return instrument_boto3_client(client, "aws")
 
-            # 3) Create or update CF stack
-            self._deploy_cloudformation(cf_template)
+    def _throttled(self, client):
+        # Every request goes through the rate limits, including the ones
+        # s3transfer makes for multipart uploads
+        client.meta.events.register("before-call", lambda **kwargs: self.throttle_api())
+        return client
 
+    def deploy_to_cloud(self):
+        s3_key = f"{self.deploy.pk}/app.zip"
+        pipeline = Pipeline(self)
+        if self.upload_mode == "delta":
+            pipeline.step("manifest", self.build_source_manifest).step(
+                "upload",
+                lambda manifest: self.upload_source_delta(
+                    S3BlobStore(self.s3_client, self.bucket), manifest
+                ),
+                requires=["manifest"],
+            )
+        else:
+            pipeline.step("package", self._package_app).step(
+                "upload",
+                lambda package: self._upload_to_s3(package, s3_key),
+                requires=["package"],
+            )
+        (
+            pipeline
+            # Conversion doesn't need the artifact, so it runs during the upload
+            .step("convert", self._convert_compose)
+            .step(
+                "validate_template",
+                lambda convert: self._validate_template(convert),
+                requires=["convert"],
+            )
+            .step(
+                "stack",
+                lambda validate_template, upload: self._deploy_cloudformation(
+                    validate_template
+                ),
+                requires=["upload", "validate_template"],
+            )
+        )
+        try:
+            pipeline.run()
+        except (DeployCancelled, SoftTimeLimitExceeded):
+            raise
         except Exception as exc:
             self.log(f"Deployment error: {exc}", "error")
             raise
 
     def _package_app(self) -> Path:
         """
-        Zips up the contents of self.temp_dir into a temporary ZIP file.
+        Zips up the contents of self.temp_dir into a ZIP in self.build_dir,
+        leaving out what .dockerignore/.deployignore exclude.
         Returns Path to ZIP.
         """
         self.log("Packaging application into ZIP", "info")
-        zip_path = Path(self.temp_dir) / "app.zip"
-
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(self.temp_dir):
-                # skip hidden dirs
-                dirs[:] = [d for d in dirs if not d.startswith(".")]
-                for fname in files:
-                    if fname.endswith((".zip", ".pyc")) or fname.startswith("."):
-                        continue
-                    full = Path(root) / fname
-                    rel = full.relative_to(self.temp_dir)
-                    if ".git" in rel.parts or rel.name == "app.zip":
-                        continue
-                    try:
-                        zf.write(full, rel)
-                    except Exception as e:
-                        self.log(f"Warning: skipped {rel}: {e}", "warning")
+        zip_path = Path(self.build_dir) / "app.zip"
+        self.package_source(zip_path)
 
         if not zip_path.exists():
             raise FileNotFoundError(f"ZIP not created at {zip_path}")
@@ -88,9 +127,17 @@ class AWSDeployer(BaseDeployer):
         if not zip_path.exists():
             raise FileNotFoundError(f"ZIP file not found: {zip_path}")
 
+        digest = file_digest(zip_path)
+        if self.artifact_uploaded(s3_key, digest):
+            self.uploaded_keys.append(s3_key)
+            self.log(f"s3://{self.bucket}/{s3_key} already uploaded; skipping", "info")
+            return
+
         self.log(f"Uploading {zip_path} to s3://{self.bucket}/{s3_key}", "info")
         try:
             self.s3_client.upload_file(str(zip_path), self.bucket, s3_key)
+            self.uploaded_keys.append(s3_key)
+            self.save_checkpoint(artifact_key=s3_key, artifact_sha256=digest)
             self.log("Upload successful", "info")
 
             # Only cleanup the ZIP file after successful upload
@@ -110,13 +157,23 @@ class AWSDeployer(BaseDeployer):
             self.log(f"Unexpected error during upload: {e}", "error")
             raise
 
+    def discard_uploads(self):
+        if not self.uploaded_keys:
+            return
+        self.s3_client.delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": key} for key in self.uploaded_keys]},
+        )
+        self.log(f"Removed {len(self.uploaded_keys)} uploaded objects from S3", "info")
+        self.uploaded_keys.clear()
+
     def _convert_compose(self) -> Path:
         """
         Converts docker-compose.yml to a CloudFormation template.
         Returns Path to generated CloudFormation YAML.
         """
         self.log("Converting docker-compose.yml to CloudFormation template", "info")
-        target = Path(self.temp_dir) / "template.yml"
+        target = Path(self.build_dir) / "template.yml"
         compose_file = Path(self.temp_dir) / "docker-compose.yml"
         try:
             subprocess.check_call(
@@ -139,6 +196,19 @@ class AWSDeployer(BaseDeployer):
         self.log("Conversion complete", "debug")
         return target
 
+    def _validate_template(self, template_path: Path) -> Path:
+        """
+        Validates the generated template with CloudFormation before the stack
+        step, so a bad conversion fails while the upload is still running.
+        """
+        try:
+            self.cf_client.validate_template(TemplateBody=template_path.read_text())
+        except self.cf_client.exceptions.ClientError as e:
+            self.log(f"Invalid CloudFormation template: {e}", "error")
+            raise
+        self.log("CloudFormation template is valid", "debug")
+        return template_path
+
     def _deploy_cloudformation(self, template_path: Path):
         """
         Creates or updates a CloudFormation stack using the given template.
@@ -149,9 +219,18 @@ class AWSDeployer(BaseDeployer):
         with open(template_path) as f:
             template_body = f.read()
 
+        digest = file_digest(template_path)
+        if self.stack_initiated(digest):
+            self.log(
+                f"Stack {self.checkpoint['stack_id']} already initiated with "
+                "this template; skipping",
+                "info",
+            )
+            return
+
         # Try update, fallback to create
         try:
-            self.cf_client.update_stack(
+            response = self.cf_client.update_stack(
                 StackName=stack_name,
                 TemplateBody=template_body,
                 Capabilities=["CAPABILITY_IAM"],
@@ -160,9 +239,10 @@ class AWSDeployer(BaseDeployer):
         except self.cf_client.exceptions.ClientError as e:
             if "No updates are to be performed" in str(e):
                 self.log("No changes detected; stack is up to date", "info")
+                self.save_checkpoint(stack_id=stack_name, template_sha256=digest)
                 return
             if "does not exist" in str(e):
-                self.cf_client.create_stack(
+                response = self.cf_client.create_stack(
                     StackName=stack_name,
                     TemplateBody=template_body,
                     Capabilities=["CAPABILITY_IAM"],
@@ -172,4 +252,5 @@ class AWSDeployer(BaseDeployer):
                 self.log(f"CloudFormation error: {e}", "error")
                 raise
 
+        self.save_checkpoint(stack_id=response["StackId"], template_sha256=digest)
         self.log(f"CloudFormation stack {action} initiated", "info")
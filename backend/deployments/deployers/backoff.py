@@ -0,0 +1,92 @@
+"""
+Shared retry/backoff policy for cloud API calls.
+
+boto3 and the OCI SDK both retry throttled and transient failures on their
+own, but with different defaults. Both are configured from the same policy
+here, so a throttled AWS call and a throttled OCI call back off the same way:
+exponential growth from DEPLOY_API_BACKOFF_BASE, capped at
+DEPLOY_API_BACKOFF_MAX, with full jitter, for at most DEPLOY_API_MAX_ATTEMPTS
+attempts. The same delays are used when a deploy task waits for a free slot.
+"""
+
+import os
+import random
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class BackoffPolicy:
+    max_attempts: int = 8
+    base: float = 1.0
+    cap: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "BackoffPolicy":
+        return cls(
+            max_attempts=int(os.getenv("DEPLOY_API_MAX_ATTEMPTS", "8")),
+            base=float(os.getenv("DEPLOY_API_BACKOFF_BASE", "1")),
+            cap=float(os.getenv("DEPLOY_API_BACKOFF_MAX", "60")),
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (starting at 0)."""
+        return random.uniform(0, min(self.cap, self.base * 2**attempt))
+
+    def botocore_config(self):
+        # Adaptive mode adds a client-side token bucket that slows down as
+        # soon as the service starts throttling
+        from botocore.config import Config
+
+        return Config(
+            retries={"total_max_attempts": self.max_attempts, "mode": "adaptive"}
+        )
+
+    def install_botocore_retries(self, client):
+        """
+        Replaces the client's standard retry handler with one that waits
+        `delay()` between attempts. Botocore only takes the attempt count from
+        its config; its own base and cap are fixed.
+        """
+        from botocore.retries import quota, standard
+
+        class Backoff(standard.BaseRetryBackoff):
+            def delay_amount(backoff, context):
+                # attempt_number is 1-based
+                return self.delay(context.attempt_number - 1)
+
+        event_name = client.meta.service_model.service_id.hyphenize()
+        unique_id = f"retry-config-{event_name}"
+        retry_quota = standard.RetryQuotaChecker(quota.RetryQuota())
+        handler = standard.RetryHandler(
+            retry_policy=standard.RetryPolicy(
+                retry_checker=standard.StandardRetryConditions(
+                    max_attempts=self.max_attempts
+                ),
+                retry_backoff=Backoff(),
+            ),
+            retry_event_adapter=standard.RetryEventAdapter(),
+            retry_quota=retry_quota,
+        )
+        client.meta.events.unregister(f"needs-retry.{event_name}", unique_id=unique_id)
+        client.meta.events.register(
+            f"after-call.{event_name}", retry_quota.release_retry_quota
+        )
+        client.meta.events.register(
+            f"needs-retry.{event_name}", handler.needs_retry, unique_id=unique_id
+        )
+        return client
+
+    def oci_retry_strategy(self):
+        import oci
+
+        return oci.retry.RetryStrategyBuilder(
+            max_attempts_check=True,
+            max_attempts=self.max_attempts,
+            total_elapsed_time_check=False,
+            service_error_check=True,
+            service_error_retry_on_any_5xx=True,
+            retry_base_sleep_time_seconds=self.base,
+            retry_exponential_growth_factor=2,
+            retry_max_wait_between_calls_seconds=self.cap,
+            backoff_type=oci.retry.BACKOFF_FULL_JITTER_EQUAL_ON_THROTTLE_VALUE,
+        ).get_retry_strategy()
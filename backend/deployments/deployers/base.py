@@ -2,9 +2,59 @@ import os
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from functools import cached_property
 
+from celery.exceptions import SoftTimeLimitExceeded
+from django.utils import timezone
+
+from deployments.deployers.backoff import BackoffPolicy
+from deployments.deployers.delta import (
+    BlobStore,
+    build_manifest,
+    loader_key,
+    upload_delta,
+)
+from deployments.deployers.packaging import (
+    IgnoreMatcher,
+    PackageReport,
+    package_directory,
+)
+from deployments.metrics import (
+    DEPLOY_LOG_BUFFERED,
+    DEPLOY_LOG_FLUSHED,
+    DEPLOY_LOG_WRITES,
+    DEPLOY_PHASE_DURATION,
+    DEPLOY_QUEUE_WAIT,
+    GIT_CLONE_DURATION,
+    time_cloud_call,
+)
 from deployments.models import Deploy, Log, Provider
+from deployments.throttling import throttle_api_call
+
+CLONE_STRATEGIES = ("full", "shallow", "partial", "sparse")
+UPLOAD_MODES = ("archive", "delta")
+LOG_LEVELS = [level for level, _ in Log.LOG_LEVEL_CHOICES]
+
+# Sparse checkout default: everything except paths packaging doesn't need
+DEFAULT_SPARSE_PATTERNS = ("/*", "!/docs/", "!/test/", "!/tests/", "!/.github/")
+
+
+class DeployCancelled(Exception):
+    """Raised at a phase boundary once cancellation was requested."""
+
+
+def sparse_patterns() -> list[str]:
+    configured = [
+        p.strip() for p in os.getenv("DEPLOY_CLONE_SPARSE_PATHS", "").split(",")
+    ]
+    patterns = [p for p in configured if p] or list(DEFAULT_SPARSE_PATTERNS)
+    # validate_project_structure always needs the compose file
+    return [*patterns, "/docker-compose.yml"]
 
 
 class BaseDeployer(ABC):
@@ -12,23 +62,101 @@ class BaseDeployer(ABC):
         self.deploy = deploy
         self.provider = None
         self.temp_dir = ""
+        # Artifacts (ZIP, templates) live outside the clone so they never end
+        # up packaged, whatever order the pipeline steps run in
+        self.build_dir = ""
         self.provider_slug = None
+        self.phase_timings: dict[str, float] = {}
+        # "archive" uploads the whole ZIP; "delta" only the blobs the
+        # content-addressed store doesn't have yet, plus a manifest
+        self.upload_mode = os.getenv("DEPLOY_UPLOAD_MODE", "archive")
+        if self.upload_mode not in UPLOAD_MODES:
+            raise ValueError(f"Unknown upload mode: {self.upload_mode}")
+        # Lines below this level are only kept in memory, and written to the
+        # database if the deployment fails
+        persist_level = os.getenv("DEPLOY_LOG_PERSIST_LEVEL", "info")
+        if persist_level not in LOG_LEVELS:
+            raise ValueError(f"Unknown log level: {persist_level}")
+        self.persist_level = LOG_LEVELS.index(persist_level)
+        self._log_buffer: deque[Log] = deque(
+            maxlen=int(os.getenv("DEPLOY_LOG_BUFFER_SIZE", "200"))
+        )
+        self._log_lock = threading.Lock()
+        # Objects this deployment wrote to the cloud, removed if it's cancelled
+        self.uploaded_keys: list[str] = []
+        # Progress persisted on the Provider row, so a retried task skips the
+        # uploads and stacks an earlier attempt already got through
+        self.checkpoint: dict = {}
+        self._checkpoint_lock = threading.Lock()
+        # Set once this attempt hit the time limit: pipeline steps that outlive
+        # it must not overwrite the checkpoint the retry resumes from
+        self.interrupted = threading.Event()
+        # Same retry/backoff settings for every cloud SDK client
+        self.backoff = BackoffPolicy.from_env()
 
     def execute_deployment(self):
         try:
             self.setup_provider()
             self.log("Starting deployment process", "info")
-            self.clone_repository()
-            self.validate_project_structure()
+            with self.phase("clone"):
+                self.clone_repository()
+            with self.phase("validate"):
+                self.validate_project_structure()
             self.deploy_to_cloud()
             self.update_deployment_status("up")
+        except DeployCancelled:
+            self.log("Deployment cancelled", "warning")
+            try:
+                self.discard_uploads()
+                self.save_checkpoint(artifact_key=None, artifact_sha256=None)
+            except Exception as e:
+                self.log(f"Could not remove uploaded objects: {e}", "warning")
+            self.update_deployment_status("cancelled")
+            raise
+        except SoftTimeLimitExceeded:
+            # The task retries from the checkpoint, so the provider stays in
+            # progress (and cancellable); it calls fail() once out of retries
+            self.interrupted.set()
+            self.log("Time limit reached; deployment will be retried", "warning")
+            raise
         except Exception as e:
-            self.log(f"Deployment failed: {str(e)}", "error")
-            self.update_deployment_status("down")
+            self.fail(f"Deployment failed: {str(e)}")
             raise
         finally:
             self.cleanup()
 
+    def fail(self, message: str):
+        """Marks the deployment down, keeping the buffered lines for context."""
+        if self.provider is None:
+            self.provider = Provider.objects.filter(
+                deploy=self.deploy, slug=self.provider_slug or self.get_provider_type()
+            ).first()
+        self.flush_log_buffer()
+        self.log(message, "error")
+        self.update_deployment_status("down")
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Times one step of the deployment. Durations are kept in
+        `phase_timings` (used by the benchmarks) and exported as metrics.
+        Phases are also where a cancelled deployment stops, and each one that
+        completes is recorded in the checkpoint.
+        """
+        self.check_cancelled()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phase_timings[name] = elapsed
+            DEPLOY_PHASE_DURATION.labels(
+                provider=self.provider_slug or self.get_provider_type(), phase=name
+            ).observe(elapsed)
+        with self._checkpoint_lock:
+            phases = [p for p in self.checkpoint.get("phases", []) if p != name]
+        self.save_checkpoint(phases=[*phases, name])
+
     def setup_provider(self):
         provider_slug = self.provider_slug or self.get_provider_type()
 
@@ -37,17 +165,141 @@ class BaseDeployer(ABC):
             slug=provider_slug,
             defaults={"status": "in_progress"},
         )
+        # A retry of an interrupted attempt (worker lost, time limit) puts
+        # the deploy back in progress and resumes from its checkpoint
+        if self.provider.status != "in_progress":
+            self.update_deployment_status("in_progress")
+        if self.provider.started_at is None:
+            self.provider.started_at = timezone.now()
+            self.provider.save(update_fields=["started_at"])
+            if self.provider.queued_at:
+                DEPLOY_QUEUE_WAIT.labels(provider=provider_slug).observe(
+                    (self.provider.started_at - self.provider.queued_at).total_seconds()
+                )
+        self.checkpoint = dict(self.provider.checkpoint)
+        if self.checkpoint:
+            self.log(
+                f"Resuming from checkpoint (completed: "
+                f"{', '.join(self.checkpoint.get('phases', [])) or 'none'})",
+                "info",
+            )
+
+    def save_checkpoint(self, **values):
+        if not self.provider or self.interrupted.is_set():
+            return
+        with self._checkpoint_lock:
+            self.checkpoint.update(values)
+            Provider.objects.filter(pk=self.provider.pk).update(
+                checkpoint=dict(self.checkpoint)
+            )
+
+    def artifact_uploaded(self, key: str, digest: str) -> bool:
+        """
+        True if an earlier attempt already uploaded this exact artifact. Callers
+        still add the key to `uploaded_keys`, so a cancel removes it.
+        """
+        return (
+            self.checkpoint.get("artifact_key") == key
+            and self.checkpoint.get("artifact_sha256") == digest
+        )
+
+    def stack_initiated(self, digest: str) -> bool:
+        """True if an earlier attempt already started the stack from this template."""
+        return bool(self.checkpoint.get("stack_id")) and (
+            self.checkpoint.get("template_sha256") == digest
+        )
+
+    @cached_property
+    def account(self) -> str:
+        """
+        Identifies the cloud account this deployer talks to, for the
+        per-account limits. Subclasses derive it from their credentials.
+        """
+        return "default"
+
+    def throttle_api(self):
+        """Blocks until the provider and account API rate limits allow a call."""
+        throttle_api_call(self.provider_slug or self.get_provider_type(), self.account)
+
+    @contextmanager
+    def api_call(self, service: str, operation: str):
+        """Rate-limits and times a call made through an SDK without hooks."""
+        provider_slug = self.provider_slug or self.get_provider_type()
+        self.throttle_api()
+        with time_cloud_call(provider_slug, service, operation):
+            yield
 
     def clone_repository(self):
+        """
+        Fetches a single commit of the repository instead of cloning every
+        branch with full history. The commit resolved by the first provider
+        is recorded on the Deploy and reused by the others, so every cloud
+        gets the same code even if the branch moves in between.
+        """
         repo_url = self.deploy.github_repo_url
+        strategy = os.getenv("DEPLOY_CLONE_STRATEGY", "shallow")
+        if strategy not in CLONE_STRATEGIES:
+            raise ValueError(f"Unknown clone strategy: {strategy}")
+        target = (
+            self.checkpoint.get("commit")
+            or self.deploy.commit_sha
+            or self.deploy.ref
+            or "HEAD"
+        )
+
         self.temp_dir = tempfile.mkdtemp()
+        self.build_dir = tempfile.mkdtemp()
+        start = time.perf_counter()
         try:
-            subprocess.check_call(["git", "clone", repo_url, self.temp_dir])
-            self.log(f"Cloned repository: {repo_url}", "info")
+            self._git("init", "-q")
+            self._git("remote", "add", "origin", repo_url)
+            fetch = ["fetch", "-q", "--no-tags"]
+            if strategy != "full":
+                fetch += ["--depth", "1"]
+            if strategy in ("partial", "sparse"):
+                # Blobs are only downloaded for the files actually checked out
+                fetch.append("--filter=blob:none")
+            if strategy == "sparse":
+                self._git("sparse-checkout", "set", "--no-cone", *sparse_patterns())
+            # The ref comes from the API: never let git parse it as an option
+            self._git(*fetch, "--end-of-options", "origin", target)
+            self._git("checkout", "-q", "FETCH_HEAD")
+            commit_sha = self._git("rev-parse", "HEAD", capture=True)
+            GIT_CLONE_DURATION.labels(strategy=strategy, outcome="ok").observe(
+                time.perf_counter() - start
+            )
         except subprocess.CalledProcessError as e:
+            GIT_CLONE_DURATION.labels(strategy=strategy, outcome="error").observe(
+                time.perf_counter() - start
+            )
             self.log(f"Git clone failed: {str(e)}", "error")
             raise
 
+        self._record_commit(commit_sha)
+        self.save_checkpoint(commit=commit_sha)
+        self.log(
+            f"Cloned repository: {repo_url} at {commit_sha[:12]} ({strategy})", "info"
+        )
+
+    def _git(self, *args, capture: bool = False):
+        command = ["git", "-C", self.temp_dir, *args]
+        if capture:
+            return subprocess.check_output(command, text=True).strip()
+        subprocess.check_call(command)
+
+    def _record_commit(self, commit_sha: str):
+        # Only the first provider to resolve the ref sets the commit
+        if Deploy.objects.filter(pk=self.deploy.pk, commit_sha="").update(
+            commit_sha=commit_sha
+        ):
+            self.deploy.commit_sha = commit_sha
+        elif self.deploy.commit_sha and self.deploy.commit_sha != commit_sha:
+            self.log(
+                f"Cloned {commit_sha[:12]} but deploy is pinned to "
+                f"{self.deploy.commit_sha[:12]}",
+                "warning",
+            )
+
     def validate_project_structure(self):
         docker_compose_path = os.path.join(self.temp_dir, "docker-compose.yml")
         if not os.path.exists(docker_compose_path):
@@ -55,6 +307,39 @@ class BaseDeployer(ABC):
             raise FileNotFoundError("docker-compose.yml not found")
         self.log("docker-compose.yml found", "info")
 
+    def package_source(self, zip_path) -> PackageReport:
+        """
+        Zips the cloned repository, honoring .dockerignore/.deployignore, and
+        logs the size breakdown by top-level directory.
+        """
+        matcher = IgnoreMatcher.from_directory(self.temp_dir)
+        report = package_directory(
+            self.temp_dir,
+            zip_path,
+            matcher,
+            on_error=lambda rel, e: self.log(f"Warning: skipped {rel}: {e}", "warning"),
+        )
+        self.log(report.summary(), "info")
+        return report
+
+    def build_source_manifest(self) -> dict:
+        """Per-file hashes of what would be packaged, for delta uploads."""
+        return build_manifest(
+            self.temp_dir,
+            IgnoreMatcher.from_directory(self.temp_dir),
+            deploy=self.deploy.pk,
+            repository=self.deploy.github_repo_url,
+            commit=self.deploy.commit_sha,
+        )
+
+    def upload_source_delta(self, store: BlobStore, manifest: dict):
+        manifest_key = f"{self.deploy.pk}/manifest.json"
+        report = upload_delta(store, self.temp_dir, manifest, manifest_key)
+        self.uploaded_keys += [manifest_key, loader_key(manifest_key)]
+        self.save_checkpoint(artifact_key=manifest_key)
+        self.log(report.summary(), "info")
+        return manifest_key
+
     @abstractmethod
     def deploy_to_cloud(self):
         pass
@@ -64,19 +349,66 @@ class BaseDeployer(ABC):
         pass
 
     def log(self, message: str, level: str = "info"):
-        Log.objects.create(
+        provider_slug = self.provider_slug or self.get_provider_type()
+        entry = Log(
             deploy=self.deploy,
             provider=self.provider,
             message=message,
             level=level,
+            timestamp=timezone.now(),
         )
+        if LOG_LEVELS.index(level) < self.persist_level:
+            with self._log_lock:
+                self._log_buffer.append(entry)
+            DEPLOY_LOG_BUFFERED.labels(provider=provider_slug, level=level).inc()
+            return
+        entry.save()
+        DEPLOY_LOG_WRITES.labels(provider=provider_slug, level=level).inc()
+
+    def flush_log_buffer(self):
+        """
+        Writes the buffered lower-level lines, with their original
+        timestamps, so a failed deployment keeps its full context.
+        """
+        with self._log_lock:
+            entries = list(self._log_buffer)
+            self._log_buffer.clear()
+        if not entries:
+            return
+        Log.objects.bulk_create(entries)
+        provider_slug = self.provider_slug or self.get_provider_type()
+        DEPLOY_LOG_FLUSHED.labels(provider=provider_slug).inc(len(entries))
+        for entry in entries:
+            DEPLOY_LOG_WRITES.labels(provider=provider_slug, level=entry.level).inc()
+
+    def check_cancelled(self):
+        if (
+            self.provider
+            and Provider.objects.filter(
+                pk=self.provider.pk, cancel_requested_at__isnull=False
+            ).exists()
+        ):
+            raise DeployCancelled(f"Deploy {self.deploy.pk} was cancelled")
+
+    def discard_uploads(self):
+        """
+        Removes what a cancelled deployment already uploaded. Providers that
+        upload artifacts override this; content-addressed delta blobs are
+        shared between deploys and never removed.
+        """
 
     def update_deployment_status(self, status: str):
         if self.provider:
             self.provider.status = status
-            self.provider.save(update_fields=["status"])
+            update_fields = ["status", "updated_at"]
+            if status in ("up", "down"):
+                self.provider.finished_at = timezone.now()
+                update_fields.append("finished_at")
+            self.provider.save(update_fields=update_fields)
 
     def cleanup(self):
+        if self.build_dir and os.path.exists(self.build_dir):
+            shutil.rmtree(self.build_dir)
         if self.temp_dir and os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
             self.log("Cleaned up temporary files", "debug")
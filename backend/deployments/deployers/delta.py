@@ -0,0 +1,173 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from deployments.deployers.packaging import (
+    IgnoreMatcher,
+    file_digest,
+    iter_package_files,
+)
+from deployments.metrics import time_cloud_call
+
+# Blobs are shared by every deploy: the same content is uploaded only once
+BLOB_PREFIX = "blobs/sha256"
+MANIFEST_VERSION = 1
+LOADER_PATH = Path(__file__).with_name("delta_loader.py")
+
+
+def blob_key(digest: str) -> str:
+    return f"{BLOB_PREFIX}/{digest[:2]}/{digest}"
+
+
+def loader_key(manifest_key: str) -> str:
+    """The loader script is stored next to its manifest."""
+    return f"{manifest_key.rsplit('/', 1)[0]}/{LOADER_PATH.name}"
+
+
+def build_manifest(root, matcher: IgnoreMatcher | None = None, **metadata) -> dict:
+    """
+    Hashes every file that would be packaged. The manifest maps each path to
+    the blob holding its content, plus its size and executable bit.
+    """
+    matcher = matcher or IgnoreMatcher.from_directory(root)
+    files = []
+    for full, rel in iter_package_files(root, matcher):
+        stat = os.stat(full)
+        files.append(
+            {
+                "path": rel,
+                "sha256": file_digest(full),
+                "size": stat.st_size,
+                "executable": bool(stat.st_mode & 0o111),
+            }
+        )
+    return {
+        "version": MANIFEST_VERSION,
+        "blob_prefix": BLOB_PREFIX,
+        **metadata,
+        "files": files,
+    }
+
+
+class BlobStore(ABC):
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def put_file(self, key: str, path: str):
+        pass
+
+    @abstractmethod
+    def put_bytes(self, key: str, data: bytes):
+        pass
+
+
+class S3BlobStore(BlobStore):
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+
+    def put_file(self, key: str, path: str):
+        self.client.upload_file(path, self.bucket, key)
+
+    def put_bytes(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+
+def _oci_call(service: str, operation: str):
+    return time_cloud_call("oracle", service, operation)
+
+
+class OCIBlobStore(BlobStore):
+    def __init__(self, client, namespace: str, bucket: str, call=_oci_call):
+        # The OCI SDK has no request hooks, so each call goes through `call`
+        # (a context manager taking service and operation) to be timed and,
+        # from a deployer, rate-limited
+        self.client = client
+        self.namespace = namespace
+        self.bucket = bucket
+        self.call = call
+
+    def exists(self, key: str) -> bool:
+        import oci
+
+        try:
+            with self.call("object_storage", "head_object"):
+                self.client.head_object(self.namespace, self.bucket, key)
+            return True
+        except oci.exceptions.ServiceError as e:
+            if e.status == 404:
+                return False
+            raise
+
+    def put_file(self, key: str, path: str):
+        with open(path, "rb") as stream, self.call("object_storage", "put_object"):
+            self.client.put_object(self.namespace, self.bucket, key, stream)
+
+    def put_bytes(self, key: str, data: bytes):
+        with self.call("object_storage", "put_object"):
+            self.client.put_object(self.namespace, self.bucket, key, data)
+
+
+@dataclass
+class DeltaReport:
+    files: int = 0
+    blobs: int = 0
+    uploaded: int = 0
+    uploaded_bytes: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"Delta upload: {self.uploaded} of {self.blobs} blobs uploaded "
+            f"({self.uploaded_bytes} bytes) for {self.files} files, "
+            f"{self.blobs - self.uploaded} reused"
+        )
+
+
+def upload_delta(
+    store: BlobStore,
+    root,
+    manifest: dict,
+    manifest_key: str,
+    max_workers: int | None = None,
+) -> DeltaReport:
+    """
+    Uploads the blobs the store doesn't have yet, then the manifest (last, so
+    a manifest never points at missing blobs) and the loader next to it.
+    """
+    max_workers = max_workers or int(os.getenv("DEPLOY_DELTA_WORKERS", "8"))
+    by_digest = {}
+    for entry in manifest["files"]:
+        by_digest.setdefault(entry["sha256"], entry)
+
+    report = DeltaReport(files=len(manifest["files"]), blobs=len(by_digest))
+
+    def sync(entry):
+        key = blob_key(entry["sha256"])
+        if store.exists(key):
+            return None
+        store.put_file(key, os.path.join(root, entry["path"]))
+        return entry["size"]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for size in pool.map(sync, by_digest.values()):
+            if size is not None:
+                report.uploaded += 1
+                report.uploaded_bytes += size
+
+    store.put_bytes(manifest_key, json.dumps(manifest).encode())
+    store.put_bytes(loader_key(manifest_key), LOADER_PATH.read_bytes())
+    return report
@@ -0,0 +1,106 @@
+"""
+Assembles an application from a delta upload manifest, on the cloud side.
+
+The deployer uploads this script next to each manifest, so it only depends on
+the standard library plus the SDK of the storage being read (boto3 or oci):
+
+    python delta_loader.py s3://bucket/42/manifest.json /srv/app
+    python delta_loader.py oci://namespace/bucket/42/manifest.json /srv/app
+    python delta_loader.py s3://bucket/42/manifest.json /srv/app --zip app.zip
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+class S3Reader:
+    def __init__(self, bucket):
+        import boto3
+
+        self.client = boto3.client("s3")
+        self.bucket = bucket
+
+    def read(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+
+class OCIReader:
+    def __init__(self, namespace, bucket):
+        import oci
+
+        config = oci.config.from_file(
+            os.getenv("OCI_CONFIG_FILE", os.path.expanduser("~/.oci/config")),
+            os.getenv("OCI_PROFILE", "DEFAULT"),
+        )
+        self.client = oci.object_storage.ObjectStorageClient(config)
+        self.namespace = namespace
+        self.bucket = bucket
+
+    def read(self, key):
+        response = self.client.get_object(self.namespace, self.bucket, key)
+        return response.data.content
+
+
+def open_manifest(url):
+    """Returns (reader, manifest key) for s3://bucket/key or oci://ns/bucket/key."""
+    scheme, _, rest = url.partition("://")
+    if scheme == "s3":
+        bucket, _, key = rest.partition("/")
+        return S3Reader(bucket), key
+    if scheme == "oci":
+        namespace, _, rest = rest.partition("/")
+        bucket, _, key = rest.partition("/")
+        return OCIReader(namespace, bucket), key
+    raise ValueError(f"Unsupported manifest URL: {url}")
+
+
+def assemble(reader, manifest, dest, workers=8):
+    prefix = manifest["blob_prefix"]
+
+    def fetch(entry):
+        parts = entry["path"].split("/")
+        if entry["path"].startswith("/") or ".." in parts:
+            raise ValueError(f"Unsafe path in manifest: {entry['path']}")
+        digest = entry["sha256"]
+        data = reader.read(f"{prefix}/{digest[:2]}/{digest}")
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Corrupted blob for {entry['path']}")
+        target = os.path.join(dest, *parts)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        if entry.get("executable"):
+            os.chmod(target, 0o755)
+        return entry["path"]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fetch, manifest["files"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("manifest_url")
+    parser.add_argument("dest")
+    parser.add_argument("--zip", help="also write the tree into this ZIP file")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    reader, key = open_manifest(args.manifest_url)
+    manifest = json.loads(reader.read(key))
+    paths = assemble(reader, manifest, args.dest, args.workers)
+
+    if args.zip:
+        with zipfile.ZipFile(args.zip, "w", zipfile.ZIP_DEFLATED) as zf:
+            for rel in paths:
+                zf.write(os.path.join(args.dest, *rel.split("/")), rel)
+
+    print(f"Assembled {len(paths)} files into {args.dest}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
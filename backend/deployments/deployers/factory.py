@@ -1,17 +1,11 @@
-from .aws import AWSDeployer
-from .oracle import OracleDeployer
+from .registry import get_deployer_class
 
 
 class DeployerFactory:
     @staticmethod
     def create_deployer(provider_slug: str, deploy):
-        deployers = {
-            "aws": AWSDeployer,
-            "oracle": OracleDeployer,
-        }
-        deployer_class = deployers.get(provider_slug)
-        if not deployer_class:
-            raise ValueError(f"Unsupported provider: {provider_slug}")
+        # A classe (e o SDK da cloud) só é importada no primeiro uso
+        deployer_class = get_deployer_class(provider_slug)
 
         # Passa o provider_slug para o deployer
         deployer = deployer_class(deploy)
@@ -1,10 +1,15 @@
 import base64
 import os
-import zipfile
+from functools import cached_property
 
 import oci
 
+from deployments.throttling import account_key
+
 from .base import BaseDeployer
+from .delta import OCIBlobStore
+from .packaging import file_digest
+from .pipeline import Pipeline
 
 
 class OracleDeployer(BaseDeployer):
@@ -12,46 +17,146 @@ class OracleDeployer(BaseDeployer):
         return "oracle"
 
     def deploy_to_cloud(self):
-        # 1) Carrega configuração OCI (arquivo e perfil via env vars ou defaults)
+        # O stack é criado a partir do ZIP local, mas só depois do upload: um
+        # upload que falha (ou um cancelamento) não deixa um stack órfão. O
+        # namespace e o empacotamento rodam em paralelo. No modo delta o ZIP
+        # continua sendo gerado para o stack, mas só os blobs novos sobem.
+        pipeline = (
+            Pipeline(self)
+            .step("config", self._load_config)
+            .step("package", self._package_app)
+            .step(
+                "namespace",
+                lambda config: self._get_namespace(config),
+                requires=["config"],
+            )
+            .step(
+                "stack",
+                lambda config, package, upload: self._create_stack(config, package),
+                requires=["config", "package", "upload"],
+            )
+        )
+        if self.upload_mode == "delta":
+            pipeline.step("manifest", self.build_source_manifest).step(
+                "upload",
+                lambda config, namespace, manifest: self.upload_source_delta(
+                    OCIBlobStore(
+                        self._object_storage(config),
+                        namespace,
+                        os.getenv("OCI_BUCKET_NAME"),
+                        call=self.api_call,
+                    ),
+                    manifest,
+                ),
+                requires=["config", "namespace", "manifest"],
+            )
+        else:
+            pipeline.step(
+                "upload",
+                lambda config, namespace, package: self._upload_package(
+                    config, namespace, package
+                ),
+                requires=["config", "namespace", "package"],
+            )
+        pipeline.run()
+
+    def _load_config(self):
+        # Carrega configuração OCI (arquivo e perfil via env vars ou defaults)
         config_file = os.getenv("OCI_CONFIG_FILE", os.path.expanduser("~/.oci/config"))
         profile = os.getenv("OCI_PROFILE", "DEFAULT")
-        config = oci.config.from_file(config_file, profile)
-
-        # 2) Zip da pasta de deploy
-        zip_path = os.path.join(self.temp_dir, "app.zip")
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for root, _, files in os.walk(self.temp_dir):
-                for f in files:
-                    full = os.path.join(root, f)
-                    rel = os.path.relpath(full, self.temp_dir)
-                    zf.write(full, rel)
-
-        # 3) Upload para Object Storage
+        return oci.config.from_file(config_file, profile)
+
+    @cached_property
+    def account(self) -> str:
+        # Limites da OCI são por tenancy e região
+        try:
+            config = self._load_config()
+        except Exception:
+            # A configuração inválida faz o deploy falhar logo depois, com o
+            # status e o log certos
+            return "default"
+        return account_key(config.get("tenancy", ""), config.get("region", ""))
+
+    def _object_storage(self, config):
+        # Erros de throttling (429) e 5xx são retentados com a política comum
+        return oci.object_storage.ObjectStorageClient(
+            config, retry_strategy=self.backoff.oci_retry_strategy()
+        )
+
+    def _package_app(self) -> str:
+        # Zip da pasta de deploy
+        zip_path = os.path.join(self.build_dir, "app.zip")
+        self.package_source(zip_path)
+        return zip_path
+
+    def _get_namespace(self, config) -> str:
+        object_client = self._object_storage(config)
+        with self.api_call("object_storage", "get_namespace"):
+            return object_client.get_namespace().data
+
+    def _upload_package(self, config, namespace: str, zip_path: str):
+        # Upload para Object Storage
         bucket_name = os.getenv("OCI_BUCKET_NAME")
-        compartment_id = os.getenv("OCI_COMPARTMENT_ID")
-        namespace = oci.object_storage.ObjectStorageClient(config).get_namespace().data
-        object_client = oci.object_storage.ObjectStorageClient(config)
+        object_client = self._object_storage(config)
         object_name = f"{self.deploy.pk}/app.zip"
-        with open(zip_path, "rb") as stream:
+        digest = file_digest(zip_path)
+        if self.artifact_uploaded(object_name, digest):
+            self.uploaded_keys.append(object_name)
+            self.log(f"{object_name} already uploaded; skipping", "info")
+            return
+        with open(zip_path, "rb") as stream, self.api_call(
+            "object_storage", "put_object"
+        ):
             object_client.put_object(
                 namespace_name=namespace,
                 bucket_name=bucket_name,
                 object_name=object_name,
                 put_object_body=stream,
             )
+        self.uploaded_keys.append(object_name)
+        self.save_checkpoint(artifact_key=object_name, artifact_sha256=digest)
         self.log(f"Uploaded package to OCI bucket “{bucket_name}”", "info")
 
-        # 4) Criação do Resource Manager Stack
-        rm = oci.resource_manager.ResourceManagerClient(config)
-        zip_bytes = open(zip_path, "rb").read()
-        zip_b64 = base64.b64encode(zip_bytes).decode("utf-8")
+    def discard_uploads(self):
+        # Remove o que um deploy cancelado já tinha enviado ao Object Storage
+        if not self.uploaded_keys:
+            return
+        config = self._load_config()
+        object_client = self._object_storage(config)
+        namespace = self._get_namespace(config)
+        bucket_name = os.getenv("OCI_BUCKET_NAME")
+        for object_name in self.uploaded_keys:
+            with self.api_call("object_storage", "delete_object"):
+                object_client.delete_object(namespace, bucket_name, object_name)
+        self.log(f"Removed {len(self.uploaded_keys)} uploaded objects from OCI", "info")
+        self.uploaded_keys.clear()
+
+    def _create_stack(self, config, zip_path: str):
+        # Criação do Resource Manager Stack
+        # No Resource Manager o próprio ZIP é o template do stack
+        digest = file_digest(zip_path)
+        if self.stack_initiated(digest):
+            self.log(
+                f"Stack {self.checkpoint['stack_id']} already initiated; skipping",
+                "info",
+            )
+            return
+
+        compartment_id = os.getenv("OCI_COMPARTMENT_ID")
+        rm = oci.resource_manager.ResourceManagerClient(
+            config, retry_strategy=self.backoff.oci_retry_strategy()
+        )
+        with open(zip_path, "rb") as f:
+            zip_b64 = base64.b64encode(f.read()).decode("utf-8")
 
         stack_details = oci.resource_manager.models.CreateStackDetails(
             compartment_id=compartment_id,
             display_name=f"deploy-{self.deploy.pk}",
             config_source=oci.resource_manager.models.CreateZipUploadConfigSourceDetails(
-                zip_file_base64_=zip_b64
+                zip_file_base64_encoded=zip_b64
             ),
         )
-        rm.create_stack(stack_details)
+        with self.api_call("resource_manager", "create_stack"):
+            response = rm.create_stack(stack_details)
+        self.save_checkpoint(stack_id=response.data.id, template_sha256=digest)
         self.log("Resource Manager stack creation initiated", "info")
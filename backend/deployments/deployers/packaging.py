@@ -0,0 +1,226 @@
+import hashlib
+import os
+import re
+import shutil
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+IGNORE_FILES = (".dockerignore", ".deployignore")
+
+# Never shipped, whatever the repository's ignore files say
+DEFAULT_IGNORE_PATTERNS = (".git", "**/__pycache__", "**/*.pyc")
+
+_WILDCARDS = re.compile(r"[*?\[]")
+
+# Earliest timestamp a ZIP entry can hold
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+def _translate(pattern: str) -> str:
+    """
+    Translates one .dockerignore pattern into a regex. Like Docker, patterns
+    are relative to the repository root, `*` and `?` don't cross `/`, `**`
+    matches any number of directories, and a pattern that matches a
+    directory also matches everything below it.
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                parts.append(re.escape(pattern[i]))
+                i += 1
+                continue
+            body = pattern[i + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body}]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts) + "(?:/.*)?"
+
+
+def _clean(pattern: str) -> str:
+    pattern = pattern.strip()
+    negated = pattern.startswith("!")
+    if negated:
+        pattern = pattern[1:].strip()
+    pattern = os.path.normpath(pattern).replace(os.sep, "/").lstrip("/")
+    return ("!" if negated else "") + pattern
+
+
+class IgnoreMatcher:
+    """
+    Compiled .dockerignore-style matcher. Rules are evaluated in order and
+    the last one that matches wins, so `!pattern` re-includes paths. Without
+    negations every pattern is folded into a single regex.
+    """
+
+    def __init__(self, patterns):
+        self.rules: list[tuple[re.Pattern, bool, str]] = []
+        for raw in patterns:
+            if not raw.strip() or raw.lstrip().startswith("#"):
+                continue
+            pattern = _clean(raw)
+            negated = pattern.startswith("!")
+            body = pattern[1:] if negated else pattern
+            if body in ("", "."):
+                continue
+            # Literal prefix, used to know whether a negation can reach a dir
+            prefix = _WILDCARDS.split(body, 1)[0]
+            self.rules.append((re.compile(_translate(body)), negated, prefix))
+
+        self.has_negations = any(negated for _, negated, _ in self.rules)
+        self._combined = (
+            None
+            if self.has_negations or not self.rules
+            else re.compile("|".join(f"(?:{r.pattern})" for r, _, _ in self.rules))
+        )
+
+    @classmethod
+    def from_directory(cls, root) -> "IgnoreMatcher":
+        patterns = list(DEFAULT_IGNORE_PATTERNS)
+        for name in IGNORE_FILES:
+            path = Path(root) / name
+            if path.is_file():
+                patterns.extend(path.read_text(errors="replace").splitlines())
+        return cls(patterns)
+
+    def matches(self, rel_path: str) -> bool:
+        """True if the path (relative, `/`-separated) should be left out."""
+        if self._combined is not None:
+            return self._combined.fullmatch(rel_path) is not None
+        ignored = False
+        for regex, negated, _ in self.rules:
+            if regex.fullmatch(rel_path):
+                ignored = not negated
+        return ignored
+
+    def can_prune(self, rel_dir: str) -> bool:
+        """
+        True if the whole directory can be skipped without walking it: it is
+        ignored and no negation could re-include something below it.
+        """
+        if not self.matches(rel_dir):
+            return False
+        for _, negated, prefix in self.rules:
+            if negated and (
+                not prefix
+                or prefix.startswith(rel_dir + "/")
+                or rel_dir.startswith(prefix)
+            ):
+                return False
+        return True
+
+
+@dataclass
+class PackageReport:
+    files: int = 0
+    size: int = 0
+    compressed_size: int = 0
+    # Top-level directory ("." for files at the root) -> [files, size, compressed]
+    by_directory: dict[str, list[int]] = field(default_factory=dict)
+
+    def summary(self, top: int = 10) -> str:
+        largest = sorted(
+            self.by_directory.items(), key=lambda item: item[1][2], reverse=True
+        )
+        lines = [
+            f"Artifact: {self.files} files, {_human(self.size)} "
+            f"({_human(self.compressed_size)} compressed)"
+        ]
+        for name, (files, size, compressed) in largest[:top]:
+            label = name if name == "." else f"{name}/"
+            lines.append(
+                f"  {label:<30} {files:>6} files {_human(size):>10} "
+                f"{_human(compressed):>10} compressed"
+            )
+        if len(largest) > top:
+            lines.append(f"  ... {len(largest) - top} more")
+        return "\n".join(lines)
+
+
+def _human(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size} B"
+
+
+def iter_package_files(root, matcher: IgnoreMatcher):
+    """Yields (full path, relative `/` path) of every file that gets packaged."""
+    root = str(root)
+    for current, dirs, files in os.walk(root):
+        rel_current = os.path.relpath(current, root).replace(os.sep, "/")
+        rel_current = "" if rel_current == "." else rel_current + "/"
+        # Sorted, so the same tree always yields the same order
+        dirs[:] = sorted(d for d in dirs if not matcher.can_prune(rel_current + d))
+        for name in sorted(files):
+            rel = rel_current + name
+            if not matcher.matches(rel):
+                yield os.path.join(current, name), rel
+
+
+def package_directory(
+    root,
+    zip_path,
+    matcher: IgnoreMatcher | None = None,
+    on_error: Callable[[str, Exception], None] | None = None,
+) -> PackageReport:
+    """
+    Zips `root` into `zip_path`, honoring the ignore rules, and returns the
+    size breakdown by top-level directory. Entries get a fixed timestamp, so
+    the same files always produce a byte-identical archive (checkout mtimes
+    change on every clone).
+    """
+    matcher = matcher or IgnoreMatcher.from_directory(root)
+    report = PackageReport()
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for full, rel in iter_package_files(root, matcher):
+            try:
+                entry = zipfile.ZipInfo.from_file(full, rel)
+                entry.date_time = ZIP_EPOCH
+                entry.compress_type = zipfile.ZIP_DEFLATED
+                with open(full, "rb") as src, zf.open(entry, "w") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(rel, e)
+                continue
+            info = zf.getinfo(rel)
+            top = rel.split("/", 1)[0] if "/" in rel else "."
+            stats = report.by_directory.setdefault(top, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += info.file_size
+            stats[2] += info.compress_size
+            report.files += 1
+            report.size += info.file_size
+            report.compressed_size += info.compress_size
+    return report
+
+
+def file_digest(path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
@@ -0,0 +1,123 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from django.db import connections
+
+
+@dataclass
+class Step:
+    name: str
+    func: Callable[..., Any]
+    requires: tuple[str, ...] = field(default_factory=tuple)
+
+
+class Pipeline:
+    """
+    Runs deployment steps as a dependency graph on a thread pool, so steps
+    that don't depend on each other (e.g. compose conversion and the artifact
+    upload) overlap.
+
+    Each step is called with the results of the steps it requires as keyword
+    arguments, and is timed through the deployer's `phase()`.
+    """
+
+    def __init__(
+        self,
+        deployer,
+        max_workers: int | None = None,
+        stop_timeout: float | None = None,
+    ):
+        self.deployer = deployer
+        self.max_workers = max_workers or int(os.getenv("DEPLOY_PIPELINE_WORKERS", "4"))
+        # How long an interrupted run waits for the steps already running
+        self.stop_timeout = (
+            stop_timeout
+            if stop_timeout is not None
+            else float(os.getenv("DEPLOY_PIPELINE_STOP_TIMEOUT", "30"))
+        )
+        self.steps: dict[str, Step] = {}
+
+    def step(self, name: str, func: Callable[..., Any], requires=()):
+        if name in self.steps:
+            raise ValueError(f"Duplicate pipeline step: {name}")
+        self.steps[name] = Step(name, func, tuple(requires))
+        return self
+
+    def _validate(self):
+        for step in self.steps.values():
+            missing = [r for r in step.requires if r not in self.steps]
+            if missing:
+                raise ValueError(f"Step {step.name} requires unknown steps: {missing}")
+
+        # Kahn's algorithm: steps left without an order form a cycle
+        pending = {name: set(step.requires) for name, step in self.steps.items()}
+        while pending:
+            ready = [name for name, deps in pending.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle between steps: {sorted(pending)}")
+            for name in ready:
+                del pending[name]
+            for deps in pending.values():
+                deps.difference_update(ready)
+
+    def _run_step(self, step: Step, results: dict[str, Any]):
+        try:
+            with self.deployer.phase(step.name):
+                return step.func(**{dep: results[dep] for dep in step.requires})
+        finally:
+            # Steps run in pool threads, each with its own DB connection
+            connections.close_all()
+
+    def run(self) -> dict[str, Any]:
+        """
+        Runs every step and returns their results by name. On the first
+        failure no new steps are started; steps already running are awaited
+        and the original exception is re-raised.
+
+        If the pipeline itself is interrupted while waiting (the task's soft
+        time limit), pending steps are cancelled and running ones get up to
+        `stop_timeout` seconds to finish, so the deployer doesn't remove its
+        workspace under them and the task still gets control back before the
+        hard limit. Steps still running after that are left behind.
+        """
+        self._validate()
+        results: dict[str, Any] = {}
+        remaining = dict(self.steps)
+        running = {}
+        error = None
+
+        pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="deploy-step"
+        )
+        try:
+            while remaining or running:
+                if error is None:
+                    ready = [
+                        step
+                        for step in remaining.values()
+                        if all(dep in results for dep in step.requires)
+                    ]
+                    for step in ready:
+                        del remaining[step.name]
+                        running[pool.submit(self._run_step, step, dict(results))] = step
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    try:
+                        results[step.name] = future.result()
+                    except Exception as e:
+                        error = error or e
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            wait(running, timeout=self.stop_timeout)
+            raise
+        pool.shutdown(wait=True)
+
+        if error is not None:
+            raise error
+        return results
@@ -0,0 +1,43 @@
+"""
+Resolves deployer classes by provider slug without importing them up front.
+
+Each deployer pulls in its cloud SDK (boto3, oci), so classes are only
+imported the first time a deploy actually needs them. Besides the built-in
+providers, installed packages can plug in new clouds through the
+`multicloud.deployers` entry point group:
+
+    [project.entry-points."multicloud.deployers"]
+    gcp = "multicloud_gcp.deployer:GCPDeployer"
+"""
+
+from functools import cache
+from importlib.metadata import entry_points
+
+from django.utils.module_loading import import_string
+
+ENTRY_POINT_GROUP = "multicloud.deployers"
+
+BUILTIN_DEPLOYERS = {
+    "aws": "deployments.deployers.aws.AWSDeployer",
+    "oracle": "deployments.deployers.oracle.OracleDeployer",
+}
+
+
+@cache
+def _entry_points():
+    return {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+
+
+def provider_slugs() -> list[str]:
+    """Every provider that can be deployed to, built-in or plugged in."""
+    return sorted({*BUILTIN_DEPLOYERS, *_entry_points()})
+
+
+@cache
+def get_deployer_class(slug: str):
+    # Built-ins win, so a plugin can't silently replace a core provider
+    if slug in BUILTIN_DEPLOYERS:
+        return import_string(BUILTIN_DEPLOYERS[slug])
+    if slug in _entry_points():
+        return _entry_points()[slug].load()
+    raise ValueError(f"Unsupported provider: {slug}")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from deployments.stats import backfill
+
+
+class Command(BaseCommand):
+    help = "Recalcula as rollups de estatísticas de deploy a partir dos providers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="só providers criados a partir desta data (ISO 8601)",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError(f"Invalid datetime: {options['since']}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        total = backfill(since)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {total} stat buckets"))
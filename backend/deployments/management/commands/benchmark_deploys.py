@@ -0,0 +1,171 @@
+import os
+import platform
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+
+from deployments.benchmarks.repos import generate_repository
+from deployments.benchmarks.runner import (
+    STUBS,
+    compare,
+    load_baseline,
+    mismatched_params,
+    run_provider,
+    save_baseline,
+)
+from deployments.deployers.base import CLONE_STRATEGIES, UPLOAD_MODES
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o pipeline de deploy completo (clone, package, upload, stack) "
+        "sem clouds reais e compara com um baseline salvo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--providers",
+            nargs="+",
+            choices=sorted(STUBS),
+            default=sorted(STUBS),
+        )
+        parser.add_argument("--iterations", type=int, default=5)
+        parser.add_argument("--files", type=int, default=200)
+        parser.add_argument("--file-size", type=int, default=4096, help="bytes")
+        parser.add_argument("--dirs", type=int, default=10)
+        parser.add_argument(
+            "--commits", type=int, default=1, help="tamanho do histórico git"
+        )
+        parser.add_argument(
+            "--clone-strategy",
+            choices=CLONE_STRATEGIES,
+            default=os.getenv("DEPLOY_CLONE_STRATEGY", "shallow"),
+        )
+        parser.add_argument(
+            "--upload-mode",
+            choices=UPLOAD_MODES,
+            default=os.getenv("DEPLOY_UPLOAD_MODE", "archive"),
+        )
+        parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="grava o resultado como novo baseline",
+        )
+        parser.add_argument(
+            "--compare",
+            action="store_true",
+            help="falha se houver regressão em relação ao baseline",
+        )
+        parser.add_argument("--tolerance", type=float, default=0.2)
+        parser.add_argument(
+            "--min-delta",
+            type=float,
+            default=0.05,
+            help="diferença mínima em segundos para contar como regressão",
+        )
+
+    def handle(self, *args, **options):
+        # Banco descartável, como nos testes: o benchmark cria muitos Deploys
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default"}
+        )
+        try:
+            with tempfile.TemporaryDirectory(prefix="deploy-bench-") as tmp:
+                workdir = Path(tmp)
+                repo_url = generate_repository(
+                    workdir / "repo",
+                    files=options["files"],
+                    file_size=options["file_size"],
+                    dirs=options["dirs"],
+                    commits=options["commits"],
+                )
+                results = {
+                    "params": {
+                        key: options[key]
+                        for key in (
+                            "iterations",
+                            "files",
+                            "file_size",
+                            "dirs",
+                            "commits",
+                            "clone_strategy",
+                            "upload_mode",
+                        )
+                    },
+                    "machine": platform.platform(),
+                    "providers": {},
+                }
+                for provider in options["providers"]:
+                    self.stdout.write(f"Benchmarking {provider}...")
+                    try:
+                        with mock.patch.dict(
+                            os.environ,
+                            {
+                                "DEPLOY_CLONE_STRATEGY": options["clone_strategy"],
+                                "DEPLOY_UPLOAD_MODE": options["upload_mode"],
+                            },
+                        ):
+                            result = run_provider(
+                                provider, repo_url, options["iterations"], workdir
+                            )
+                    except ImportError as e:
+                        raise CommandError(str(e))
+                    results["providers"][provider] = result
+                    self._report(provider, result)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        # Um deploy que falhou não mede nada: não compara nem grava baseline
+        failed = [
+            provider
+            for provider, result in results["providers"].items()
+            if result["errors"]
+        ]
+        if failed:
+            raise CommandError(f"Deploys failed on: {', '.join(failed)}")
+
+        if options["compare"]:
+            if not options["baseline"].exists():
+                raise CommandError(f"Baseline not found: {options['baseline']}")
+            baseline = load_baseline(options["baseline"])
+            mismatches = mismatched_params(results, baseline)
+            if mismatches:
+                raise CommandError(
+                    "Run parameters differ from the baseline:\n  "
+                    + "\n  ".join(mismatches)
+                )
+            regressions = compare(
+                results,
+                baseline,
+                options["tolerance"],
+                options["min_delta"],
+            )
+            if regressions:
+                raise CommandError(
+                    "Performance regressions:\n  " + "\n  ".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
+
+        if options["save_baseline"]:
+            save_baseline(options["baseline"], results)
+            self.stdout.write(f"Baseline saved to {options['baseline']}")
+
+    def _report(self, provider, result):
+        for phase, stats in result["phases"].items():
+            self.stdout.write(
+                f"  {phase:<18} mean {stats['mean']:.3f}s  "
+                f"median {stats['median']:.3f}s  max {stats['max']:.3f}s"
+            )
+        self.stdout.write(
+            f"  deploys/min {result['deploys_per_minute']:.1f}  "
+            f"peak RSS {result['peak_rss_mb']} MB"
+        )
+        for error in result["errors"]:
+            self.stdout.write(self.style.ERROR(f"  error: {error}"))
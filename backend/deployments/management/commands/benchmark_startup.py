@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from deployments.benchmarks.startup import PROBES, measure
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo de import do processo web (manage.py) e do worker Celery, "
+        "cada um num interpretador novo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--probes",
+            nargs="+",
+            choices=list(PROBES),
+            default=list(PROBES),
+        )
+        parser.add_argument("--runs", type=int, default=5)
+
+    def handle(self, *args, **options):
+        for probe in options["probes"]:
+            result = measure(probe, options["runs"], settings.BASE_DIR)
+            self.stdout.write(
+                f"{probe:<8} median {result['median']:.3f}s  "
+                f"min {result['min']:.3f}s  max {result['max']:.3f}s  "
+                f"{result['modules']} modules"
+            )
+            heavy = ", ".join(result["heavy"]) or "none"
+            self.stdout.write(f"         SDKs loaded: {heavy}")
@@ -0,0 +1,227 @@
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from deployments.models import Deploy
+
+
+def percentile(sorted_values, pct):
+    """Percentil pelo método nearest-rank."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class InProcessTransport:
+    """
+    Chama a API pelo handler do Django no mesmo processo, o que permite contar
+    as queries feitas em cada requisição.
+    """
+
+    def __init__(self):
+        host = next(
+            (h.lstrip(".") for h in settings.ALLOWED_HOSTS if h != "*"), "localhost"
+        )
+        self.local = threading.local()
+        self.host = host
+
+    def get(self, path):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = Client(HTTP_HOST=self.host)
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count):
+            response = client.get(path)
+        return response.status_code, time.perf_counter() - start, queries
+
+    def close(self):
+        connection.close()
+
+
+class HTTPTransport:
+    """Chama uma API já em execução (ex.: gunicorn/docker); sem contagem de queries."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def get(self, path):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(
+                self.base_url + path, timeout=self.timeout
+            ) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except OSError:
+            status = 0
+        return status, time.perf_counter() - start, None
+
+    def close(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula vários frontends fazendo polling nos endpoints de deployments, "
+        "logs e providers e reporta percentis de latência e queries por requisição."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=50)
+        parser.add_argument("--duration", type=float, default=30, help="segundos")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=3.0,
+            help="intervalo de polling de cada cliente (o frontend usa 3s)",
+        )
+        parser.add_argument(
+            "--detail-ratio",
+            type=float,
+            default=0.7,
+            help="fração dos clientes na página de detalhe (o resto fica na lista)",
+        )
+        parser.add_argument(
+            "--base-url",
+            help="testa um servidor HTTP em vez de chamar o Django no processo",
+        )
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--sample-deploys", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", action="store_true", help="saída em JSON")
+
+    def handle(self, *args, **options):
+        if options["base_url"]:
+            transport = HTTPTransport(options["base_url"], options["timeout"])
+        else:
+            transport = InProcessTransport()
+
+        deploy_ids = list(
+            Deploy.objects.order_by("-created_at").values_list("pk", flat=True)[
+                : options["sample_deploys"]
+            ]
+        )
+        if not deploy_ids:
+            raise CommandError("No deployments found; run seed_deployments first")
+
+        rng = random.Random(options["seed"])
+        samples: dict[str, list[tuple[int, float, int | None]]] = {}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options["duration"]
+
+        def record(endpoint, result):
+            with lock:
+                samples.setdefault(endpoint, []).append(result)
+
+        def dashboard_client(offset):
+            time.sleep(offset)
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                record("deployment-list", transport.get("/api/deployments/"))
+                time.sleep(max(0, options["interval"] - (time.monotonic() - started)))
+            transport.close()
+
+        def detail_client(offset, deploy_id):
+            time.sleep(offset)
+            polls = 0
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                record(
+                    "deployment-detail",
+                    transport.get(f"/api/deployments/{deploy_id}/"),
+                )
+                record(
+                    "deployment-logs",
+                    transport.get(f"/api/deployments/{deploy_id}/logs/"),
+                )
+                if polls % 3 == 0:
+                    record(
+                        "provider-list",
+                        transport.get(f"/api/providers/?deploy_id={deploy_id}"),
+                    )
+                polls += 1
+                time.sleep(max(0, options["interval"] - (time.monotonic() - started)))
+            transport.close()
+
+        threads = []
+        for i in range(options["clients"]):
+            offset = rng.random() * options["interval"]
+            if rng.random() < options["detail_ratio"]:
+                # Deploys recentes são os mais acompanhados
+                deploy_id = deploy_ids[int(len(deploy_ids) * rng.random() ** 3)]
+                target, args = detail_client, (offset, deploy_id)
+            else:
+                target, args = dashboard_client, (offset,)
+            threads.append(threading.Thread(target=target, args=args, daemon=True))
+
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        report = self._summarize(samples, elapsed)
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print(report)
+
+    def _summarize(self, samples, elapsed):
+        report = {}
+        for endpoint, results in sorted(samples.items()):
+            latencies = sorted(r[1] * 1000 for r in results)
+            queries = [r[2] for r in results if r[2] is not None]
+            report[endpoint] = {
+                "requests": len(results),
+                "errors": sum(1 for r in results if not 200 <= r[0] < 400),
+                "rps": len(results) / elapsed,
+                "p50_ms": percentile(latencies, 50),
+                "p90_ms": percentile(latencies, 90),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": latencies[-1],
+                "queries_mean": sum(queries) / len(queries) if queries else None,
+                "queries_max": max(queries) if queries else None,
+            }
+        return report
+
+    def _print(self, report):
+        header = (
+            f"{'endpoint':<18} {'reqs':>6} {'err':>4} {'rps':>6} {'p50':>8} "
+            f"{'p90':>8} {'p95':>8} {'p99':>8} {'max':>8} {'queries':>10}"
+        )
+        self.stdout.write(header)
+        for endpoint, stats in report.items():
+            queries = (
+                f"{stats['queries_mean']:.1f}/{stats['queries_max']}"
+                if stats["queries_mean"] is not None
+                else "-"
+            )
+            self.stdout.write(
+                f"{endpoint:<18} {stats['requests']:>6} {stats['errors']:>4} "
+                f"{stats['rps']:>6.1f} {stats['p50_ms']:>8.1f} {stats['p90_ms']:>8.1f} "
+                f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+                f"{stats['max_ms']:>8.1f} {queries:>10}"
+            )
+        self.stdout.write("latências em ms; queries = média/máximo por requisição")
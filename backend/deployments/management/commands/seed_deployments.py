@@ -0,0 +1,236 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from deployments.models import Deploy, Log, Provider
+
+# Combinações de providers escolhidas em um deploy e seus pesos
+PROVIDER_SETS = [(("aws",), 45), (("oracle",), 25), (("aws", "oracle"), 30)]
+
+# Resultado final de cada provider (deploys recentes ficam em andamento)
+FINAL_STATUSES = [("up", 85), ("down", 15)]
+
+LEVEL_WEIGHTS = {
+    "up": [("debug", 30), ("info", 62), ("warning", 8)],
+    "down": [
+        ("debug", 25),
+        ("info", 50),
+        ("warning", 12),
+        ("error", 11),
+        ("critical", 2),
+    ],
+    "in_progress": [("debug", 30), ("info", 65), ("warning", 5)],
+}
+
+MESSAGES = {
+    "debug": [
+        "Created ZIP ({size} bytes)",
+        "Cleaned up ZIP file /tmp/tmp{token}/app.zip",
+        "Conversion complete",
+        "Cleaned up temporary files",
+    ],
+    "info": [
+        "Starting deployment process",
+        "Cloned repository: {repo}",
+        "docker-compose.yml found",
+        "Packaging application into ZIP",
+        "Uploading /tmp/tmp{token}/app.zip to s3://hackathon-itau/{deploy}/app.zip",
+        "Upload successful",
+        "Deploying CloudFormation stack: deploy-{deploy}",
+        "CloudFormation stack create initiated",
+        "Resource Manager stack creation initiated",
+    ],
+    "warning": [
+        "Warning: skipped node_modules/.cache/{token}: Permission denied",
+        "Warning: Could not remove ZIP file /tmp/tmp{token}/app.zip",
+    ],
+    "error": [
+        "Git clone failed: Command '['git', 'clone']' returned non-zero exit status 128.",
+        "Compose conversion failed: returned non-zero exit status 1.",
+        "S3 upload failed: An error occurred (SlowDown) when calling PutObject",
+        "Deployment failed: docker-compose.yml not found",
+    ],
+    "critical": ["Deployment failed: worker lost while deploying"],
+}
+
+
+def cumulative(choices):
+    """Pré-calcula os pesos acumulados (rng.choices fica bem mais rápido)."""
+    values, weights = zip(*choices)
+    return values, list(accumulate(weights))
+
+
+def weighted(rng, table):
+    values, cum_weights = table
+    return rng.choices(values, cum_weights=cum_weights)[0]
+
+
+PROVIDER_SET_TABLE = cumulative(PROVIDER_SETS)
+FINAL_STATUS_TABLE = cumulative(FINAL_STATUSES)
+LEVEL_TABLES = {status: cumulative(levels) for status, levels in LEVEL_WEIGHTS.items()}
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Desliga temporariamente auto_now/auto_now_add para que o bulk_create
+    grave as datas geradas em vez de "agora".
+    """
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    original = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in original:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula o banco com Deploys, Providers e Logs sintéticos em volume de "
+        "produção, para testes de carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--deploys", type=int, default=100_000)
+        parser.add_argument(
+            "--logs", type=int, default=10_000_000, help="total aproximado de logs"
+        )
+        parser.add_argument("--repos", type=int, default=500)
+        parser.add_argument(
+            "--days", type=int, default=90, help="janela de criação dos deploys"
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        self.rng = rng
+        self.now = timezone.now()
+        self.window = timedelta(days=options["days"])
+        # Poucos repositórios concentram a maioria dos deploys (lei de Zipf)
+        self.repos = [
+            f"https://github.com/seed-org/service-{i:04d}"
+            for i in range(options["repos"])
+        ]
+        self.repo_table = cumulative(
+            (repo, 1 / (rank + 1)) for rank, repo in enumerate(self.repos)
+        )
+        # Média de logs por provider para atingir o total pedido
+        avg_providers = sum(len(s) * w for s, w in PROVIDER_SETS) / sum(
+            w for _, w in PROVIDER_SETS
+        )
+        self.logs_per_provider = options["logs"] / max(
+            options["deploys"] * avg_providers, 1
+        )
+
+        batch_size = options["batch_size"]
+        totals = {"deploys": 0, "providers": 0, "logs": 0}
+        with explicit_timestamps(Deploy, Provider, Log):
+            for offset in range(0, options["deploys"], batch_size):
+                size = min(batch_size, options["deploys"] - offset)
+                counts = self._seed_batch(size, batch_size)
+                for key, value in counts.items():
+                    totals[key] += value
+                self.stdout.write(
+                    f"{totals['deploys']} deploys, {totals['providers']} providers, "
+                    f"{totals['logs']} logs"
+                )
+        self.stdout.write(self.style.SUCCESS("Seed complete"))
+
+    @transaction.atomic
+    def _seed_batch(self, size, batch_size):
+        rng = self.rng
+        deploys, plans = [], []
+        for _ in range(size):
+            # Mais deploys recentes que antigos (uso crescente)
+            created = self.now - self.window * rng.random() ** 1.5
+            repo = weighted(rng, self.repo_table)
+            deploy = Deploy(github_repo_url=repo, created_at=created)
+            slugs = weighted(rng, PROVIDER_SET_TABLE)
+            provider_plans = []
+            for slug in slugs:
+                # Deploys criados nos últimos minutos podem ainda estar rodando
+                recent = (self.now - created) < timedelta(minutes=30)
+                status = (
+                    "in_progress"
+                    if recent and rng.random() < 0.5
+                    else weighted(rng, FINAL_STATUS_TABLE)
+                )
+                duration = timedelta(seconds=min(rng.lognormvariate(5, 0.6), 1800))
+                provider_plans.append((slug, status, duration))
+            finished = [created + d for _, s, d in provider_plans if s != "in_progress"]
+            deploy.updated_at = max(finished, default=created)
+            if len(finished) == len(provider_plans):
+                deploy.completed_at = max(finished)
+            deploys.append(deploy)
+            plans.append(provider_plans)
+
+        Deploy.objects.bulk_create(deploys, batch_size=batch_size)
+
+        providers = []
+        for deploy, provider_plans in zip(deploys, plans):
+            for slug, status, duration in provider_plans:
+                providers.append(
+                    Provider(
+                        deploy=deploy,
+                        slug=slug,
+                        status=status,
+                        created_at=deploy.created_at,
+                        updated_at=min(deploy.created_at + duration, self.now),
+                        finished_at=(
+                            None
+                            if status == "in_progress"
+                            else deploy.created_at + duration
+                        ),
+                    )
+                )
+        Provider.objects.bulk_create(providers, batch_size=batch_size)
+
+        logs, log_count = [], 0
+        for provider in providers:
+            for log in self._logs_for(provider):
+                logs.append(log)
+                if len(logs) >= batch_size * 10:
+                    Log.objects.bulk_create(logs, batch_size=batch_size)
+                    log_count += len(logs)
+                    logs = []
+        Log.objects.bulk_create(logs, batch_size=batch_size)
+        log_count += len(logs)
+
+        return {"deploys": size, "providers": len(providers), "logs": log_count}
+
+    def _logs_for(self, provider):
+        rng = self.rng
+        count = max(1, round(rng.expovariate(1 / self.logs_per_provider)))
+        start = provider.created_at
+        span = (min(provider.updated_at, self.now) - start).total_seconds()
+        offsets = sorted(rng.random() * span for _ in range(count))
+        levels = LEVEL_TABLES[provider.status]
+        for offset in offsets:
+            level = weighted(rng, levels)
+            message = rng.choice(MESSAGES[level]).format(
+                size=rng.randint(10_000, 50_000_000),
+                token=f"{rng.getrandbits(32):08x}",
+                repo=provider.deploy.github_repo_url,
+                deploy=provider.deploy.pk,
+            )
+            yield Log(
+                deploy=provider.deploy,
+                provider=provider,
+                message=message,
+                level=level,
+                timestamp=start + timedelta(seconds=offset),
+            )
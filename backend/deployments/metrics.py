@@ -0,0 +1,270 @@
+"""
+Métricas Prometheus da API, dos workers Celery e das chamadas às clouds.
+
+Web e workers rodam em vários processos. Para que o endpoint /metrics agregue
+os valores de todos eles, defina PROMETHEUS_MULTIPROC_DIR (o mesmo diretório,
+vazio, compartilhado entre web e workers) antes de iniciar os processos.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from celery.exceptions import Retry
+from celery.signals import after_task_publish, worker_process_shutdown
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Deploys levam minutos, então os buckets padrão (até 10s) não servem
+LONG_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, float("inf"))
+
+HTTP_REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds",
+    "Latência das requisições HTTP por rota",
+    ["method", "route", "status"],
+)
+
+CELERY_TASKS_QUEUED = Counter(
+    "celery_tasks_queued_total",
+    "Tasks publicadas no broker",
+    ["task"],
+)
+CELERY_TASKS_STARTED = Counter(
+    "celery_tasks_started_total",
+    "Tasks iniciadas pelos workers",
+    ["task"],
+)
+CELERY_TASKS_FINISHED = Counter(
+    "celery_tasks_finished_total",
+    "Tasks finalizadas, por resultado",
+    ["task", "outcome"],
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Duração das tasks, por resultado",
+    ["task", "outcome"],
+    buckets=LONG_BUCKETS,
+)
+
+DEPLOY_LOG_WRITES = Counter(
+    "deploy_log_writes_total",
+    "Linhas de log de deploy gravadas no banco",
+    ["provider", "level"],
+)
+DEPLOY_LOG_BUFFERED = Counter(
+    "deploy_log_buffered_total",
+    "Linhas de log abaixo do nível persistido, guardadas em memória",
+    ["provider", "level"],
+)
+DEPLOY_LOG_FLUSHED = Counter(
+    "deploy_log_flushed_total",
+    "Linhas do buffer gravadas no banco porque o deploy falhou",
+    ["provider"],
+)
+GITHUB_WEBHOOK_EVENTS = Counter(
+    "github_webhook_events_total",
+    "Eventos recebidos pelo webhook do GitHub, por resultado",
+    ["event", "outcome"],
+)
+DEPLOY_PHASE_DURATION = Histogram(
+    "deploy_phase_duration_seconds",
+    "Duração de cada etapa do deploy (clone, package, upload, ...)",
+    ["provider", "phase"],
+    buckets=LONG_BUCKETS,
+)
+DEPLOY_QUEUE_WAIT = Histogram(
+    "deploy_queue_wait_seconds",
+    "Tempo entre a publicação do deploy na fila e o início no worker",
+    ["provider"],
+    buckets=LONG_BUCKETS,
+)
+DEPLOY_SLOT_DEFERRALS = Counter(
+    "deploy_slot_deferrals_total",
+    "Deploys adiados por falta de slot no limite de concorrência",
+    ["provider"],
+)
+GIT_CLONE_DURATION = Histogram(
+    "git_clone_duration_seconds",
+    "Duração do git clone dos repositórios",
+    ["strategy", "outcome"],
+    buckets=LONG_BUCKETS,
+)
+CLOUD_API_CALL_DURATION = Histogram(
+    "cloud_api_call_duration_seconds",
+    "Duração das chamadas às APIs das clouds",
+    ["provider", "service", "operation", "outcome"],
+    buckets=LONG_BUCKETS,
+)
+
+
+class TaskRun:
+    """Resultado de uma execução acompanhada por `track_task`."""
+
+    def __init__(self):
+        self.outcome = "succeeded"
+
+    def fail(self):
+        self.outcome = "failed"
+
+
+@contextmanager
+def track_task(task_name: str):
+    """
+    Mede uma execução de task. As tasks de deploy tratam as próprias exceções
+    e retornam uma mensagem, então elas chamam `run.fail()` explicitamente.
+    """
+    CELERY_TASKS_STARTED.labels(task=task_name).inc()
+    run = TaskRun()
+    start = time.perf_counter()
+    try:
+        yield run
+    except Retry:
+        run.outcome = "retried"
+        raise
+    except BaseException:
+        run.fail()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        CELERY_TASKS_FINISHED.labels(task=task_name, outcome=run.outcome).inc()
+        CELERY_TASK_DURATION.labels(task=task_name, outcome=run.outcome).observe(
+            elapsed
+        )
+
+
+@contextmanager
+def time_cloud_call(provider: str, service: str, operation: str):
+    """Mede uma chamada a SDK de cloud que não expõe hooks (ex.: OCI)."""
+    outcome = "ok"
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        CLOUD_API_CALL_DURATION.labels(
+            provider=provider, service=service, operation=operation, outcome=outcome
+        ).observe(time.perf_counter() - start)
+
+
+def instrument_boto3_client(client, provider: str):
+    """
+    Registra hooks de eventos do botocore para medir todas as chamadas do
+    client, inclusive as feitas internamente pelo s3transfer (multipart).
+    """
+    service = client.meta.service_model.service_name
+
+    def _before_call(model, context, **kwargs):
+        context["metrics_operation"] = model.name
+        context["metrics_start"] = time.perf_counter()
+
+    def _observe(context, outcome):
+        start = context.get("metrics_start")
+        if start is None:
+            return
+        CLOUD_API_CALL_DURATION.labels(
+            provider=provider,
+            service=service,
+            operation=context["metrics_operation"],
+            outcome=outcome,
+        ).observe(time.perf_counter() - start)
+
+    def _after_call(http_response, context, **kwargs):
+        _observe(context, "ok" if http_response.status_code < 300 else "error")
+
+    def _after_call_error(context, **kwargs):
+        _observe(context, "error")
+
+    client.meta.events.register("before-call", _before_call)
+    client.meta.events.register("after-call", _after_call)
+    client.meta.events.register("after-call-error", _after_call_error)
+    return client
+
+
+class CeleryQueueCollector:
+    """Tamanho das filas do broker, lido no momento do scrape."""
+
+    def _family(self):
+        return GaugeMetricFamily(
+            "celery_queue_length", "Mensagens aguardando na fila", labels=["queue"]
+        )
+
+    def describe(self):
+        # Evita que o registry chame collect() (e acesse o broker) no registro
+        return [self._family()]
+
+    @staticmethod
+    def queue_names() -> list[str]:
+        """
+        Fila padrão e, com DEPLOY_PROVIDER_QUEUES, a fila de cada provider.
+        As filas por provider são criadas sob demanda pelo roteamento e não
+        aparecem em app.amqp.queues no processo web.
+        """
+        from django.conf import settings
+
+        from core.celery import app
+        from deployments.deployers.registry import provider_slugs
+        from deployments.routing import deploy_queue
+
+        queues = [app.conf.task_default_queue]
+        if settings.DEPLOY_PROVIDER_QUEUES:
+            queues += [deploy_queue(slug) for slug in provider_slugs()]
+        return queues
+
+    def collect(self):
+        from core.celery import app
+
+        gauge = self._family()
+        queues = self.queue_names()
+        try:
+            with app.connection_for_read() as conn:
+                conn.ensure_connection(max_retries=1)
+                channel = conn.default_channel
+                for queue in queues:
+                    try:
+                        _, count, _ = channel.queue_declare(queue=queue, passive=True)
+                    except Exception:
+                        # Fila ainda não criada no broker (ex.: lista vazia no Redis)
+                        count = 0
+                    gauge.add_metric([queue], count)
+        except Exception as e:
+            logger.warning("Could not read Celery queue lengths: %s", e)
+            return
+        yield gauge
+
+
+def build_registry():
+    """Registry usado pelo endpoint /metrics."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(CeleryQueueCollector())
+        return registry
+    return REGISTRY
+
+
+if not MULTIPROC_DIR:
+    REGISTRY.register(CeleryQueueCollector())
+
+
+@after_task_publish.connect
+def _count_published_task(sender=None, **kwargs):
+    CELERY_TASKS_QUEUED.labels(task=sender).inc()
+
+
+@worker_process_shutdown.connect
+def _mark_worker_process_dead(pid=None, **kwargs):
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,24 @@
+import time
+
+from deployments.metrics import HTTP_REQUEST_DURATION
+
+
+class MetricsMiddleware:
+    """Mede a latência de cada requisição, agrupada pela rota do Django."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        # Usa o padrão da rota (ex.: api/deployments/<int:pk>/) para não
+        # criar uma série por id
+        route = match.route if match else "<unmatched>"
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method,
+            route=route,
+            status=response.status_code,
+        ).observe(time.perf_counter() - start)
+        return response
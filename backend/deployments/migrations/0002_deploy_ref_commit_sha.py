@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-19 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deployments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deploy',
+            name='commit_sha',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='deploy',
+            name='ref',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.2 on 2026-10-19 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deployments', '0004_deploybatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRedeploy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('github_repo_url', models.URLField()),
+                ('branch', models.CharField(max_length=255)),
+                ('commit_sha', models.CharField(max_length=40)),
+                ('providers', models.JSONField(default=list)),
+                ('pushes', models.PositiveIntegerField(default=1)),
+                ('first_push_at', models.DateTimeField()),
+                ('due_at', models.DateTimeField()),
+            ],
+            options={
+                'unique_together': {('github_repo_url', 'branch')},
+            },
+        ),
+    ]
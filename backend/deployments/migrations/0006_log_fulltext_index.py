@@ -0,0 +1,69 @@
+from django.db import migrations
+
+# SQLite: tabela FTS5 "external content" sobre deployments_log, mantida por
+# triggers. PostgreSQL: índice GIN sobre o tsvector da mensagem. Outros bancos
+# ficam sem índice e a busca cai no icontains.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE deployments_log_fts USING fts5(
+        message, content='deployments_log', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER deployments_log_fts_insert AFTER INSERT ON deployments_log BEGIN
+        INSERT INTO deployments_log_fts(rowid, message) VALUES (new.id, new.message);
+    END
+    """,
+    """
+    CREATE TRIGGER deployments_log_fts_delete AFTER DELETE ON deployments_log BEGIN
+        INSERT INTO deployments_log_fts(deployments_log_fts, rowid, message)
+        VALUES ('delete', old.id, old.message);
+    END
+    """,
+    """
+    CREATE TRIGGER deployments_log_fts_update AFTER UPDATE OF message ON deployments_log BEGIN
+        INSERT INTO deployments_log_fts(deployments_log_fts, rowid, message)
+        VALUES ('delete', old.id, old.message);
+        INSERT INTO deployments_log_fts(rowid, message) VALUES (new.id, new.message);
+    END
+    """,
+    # Indexa os logs que já existem
+    "INSERT INTO deployments_log_fts(deployments_log_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS deployments_log_fts_insert",
+    "DROP TRIGGER IF EXISTS deployments_log_fts_delete",
+    "DROP TRIGGER IF EXISTS deployments_log_fts_update",
+    "DROP TABLE IF EXISTS deployments_log_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX deployments_log_message_fts ON deployments_log "
+    "USING GIN (to_tsvector('simple', message))",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS deployments_log_message_fts",
+]
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, []):
+            schema_editor.execute(sql)
+
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deployments', '0005_pendingredeploy'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.2 on 2026-10-19 19:30
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_finished_at(apps, schema_editor):
+    # Para deploys antigos, a última atualização é a melhor estimativa do fim
+    Provider = apps.get_model('deployments', 'Provider')
+    Provider.objects.filter(status__in=['up', 'down'], finished_at=None).update(
+        finished_at=F('updated_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deployments', '0006_log_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeployStatRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('provider', models.CharField(max_length=20)),
+                ('started', models.PositiveIntegerField(default=0)),
+                ('succeeded', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('mean_duration', models.FloatField(blank=True, null=True)),
+                ('p95_duration', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='provider',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=models.Index(fields=['updated_at'], name='deployments_updated_8efbdf_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='deploystatrollup',
+            unique_together={('period', 'bucket_start', 'provider')},
+        ),
+        migrations.RunPython(fill_finished_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-19 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deployments', '0007_deploy_stat_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provider',
+            name='cancel_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='provider',
+            name='status',
+            field=models.CharField(choices=[('in_progress', 'In Progress'), ('up', 'Up'), ('down', 'Down'), ('cancelled', 'Cancelled')], default='in_progress', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-19 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deployments', '0008_provider_cancellation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provider',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
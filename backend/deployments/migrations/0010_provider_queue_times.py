@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-19 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deployments', '0009_provider_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provider',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='provider',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
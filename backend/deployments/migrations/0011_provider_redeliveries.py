@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-19 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deployments', '0010_provider_queue_times'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provider',
+            name='redeliveries',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
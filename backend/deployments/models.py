@@ -1,8 +1,29 @@
 from django.db import models
+from django.utils import timezone
+
+
+class DeployBatch(models.Model):
+    """Conjunto de deploys criados juntos pelo endpoint de lote."""
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Batch {self.pk}"
 
 
 class Deploy(models.Model):
     github_repo_url = models.URLField()
+    batch = models.ForeignKey(
+        DeployBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="deploys",
+    )
+    # Branch, tag ou commit a publicar; vazio usa o branch padrão do repositório
+    ref = models.CharField(max_length=255, blank=True, default="")
+    # Commit efetivamente publicado, resolvido no primeiro clone
+    commit_sha = models.CharField(max_length=40, blank=True, default="")
     completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -16,6 +37,7 @@ class Provider(models.Model):
         ("in_progress", "In Progress"),
         ("up", "Up"),
         ("down", "Down"),
+        ("cancelled", "Cancelled"),
     ]
 
     deploy = models.ForeignKey(
@@ -27,14 +49,91 @@ class Provider(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Quando o provider terminou (up ou down); usado nas estatísticas de duração
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Pedido de cancelamento (manual ou por um deploy mais novo); o deployer
+    # confere entre as fases e para no próximo limite
+    cancel_requested_at = models.DateTimeField(null=True, blank=True)
+    # Progresso salvo pelo deployer (commit, hash e chave do artefato, hash do
+    # template, id do stack) para que um retry continue de onde parou
+    checkpoint = models.JSONField(default=dict, blank=True)
+    # Quando a task foi publicada na fila do provider e quando um worker a
+    # pegou pela primeira vez; a diferença é o tempo de espera na fila
+    queued_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Quantas vezes a task voltou para a fila porque o worker morreu no meio
+    redeliveries = models.PositiveIntegerField(default=0)
 
     class Meta:
         unique_together = ("deploy", "slug")
+        # As rollups buscam os providers alterados desde a última execução
+        indexes = [models.Index(fields=["updated_at"])]
 
     def __str__(self):
         return f"{self.slug} for Deploy {self.deploy.pk}"
 
 
+class PendingRedeploy(models.Model):
+    """
+    Redeploy pedido por pushes do webhook do GitHub, ainda na janela de
+    debounce. Pushes seguidos no mesmo branch só atualizam o commit; quando a
+    janela fecha, um único Deploy é criado com o último commit.
+    """
+
+    github_repo_url = models.URLField()
+    branch = models.CharField(max_length=255)
+    commit_sha = models.CharField(max_length=40)
+    providers = models.JSONField(default=list)
+    pushes = models.PositiveIntegerField(default=1)
+    first_push_at = models.DateTimeField()
+    due_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("github_repo_url", "branch")
+
+    def __str__(self):
+        return f"Redeploy {self.github_repo_url}@{self.branch} ({self.pushes} pushes)"
+
+
+class DeployStatRollup(models.Model):
+    """
+    Estatísticas pré-calculadas por provider e por hora/dia, agrupadas pelo
+    início do deploy. Mantidas pela task rollup_deploy_stats_task.
+    """
+
+    PERIOD_CHOICES = [
+        ("hour", "Hour"),
+        ("day", "Day"),
+    ]
+
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    bucket_start = models.DateTimeField()
+    provider = models.CharField(max_length=20)
+    started = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # Duração em segundos dos providers que terminaram
+    mean_duration = models.FloatField(null=True, blank=True)
+    p95_duration = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("period", "bucket_start", "provider")
+
+    def __str__(self):
+        return f"{self.provider} {self.period} {self.bucket_start:%Y-%m-%d %H:%M}"
+
+
+class RollupWatermark(models.Model):
+    """Até onde (Provider.updated_at) as rollups já foram processadas."""
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
 class Log(models.Model):
     LOG_LEVEL_CHOICES = [
         ("debug", "Debug"),
@@ -50,7 +149,9 @@ class Log(models.Model):
     )
     message = models.TextField()
     level = models.CharField(max_length=20, choices=LOG_LEVEL_CHOICES, default="info")
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Não é auto_now_add: linhas guardadas em memória e gravadas só se o deploy
+    # falhar mantêm o horário em que foram emitidas
+    timestamp = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"[{self.level.upper()}] {self.timestamp} - {self.provider}: {self.message[:50]}"
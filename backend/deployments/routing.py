@@ -0,0 +1,20 @@
+"""
+Roteamento das tasks do Celery: cada provider tem a própria fila de deploy
+(deploy.<slug>), consumida por workers dedicados, para que stacks lentos numa
+cloud não atrasem os deploys das outras.
+"""
+
+from django.conf import settings
+
+DEPLOY_TASK = "deployments.tasks.deploy_to_provider_task"
+
+
+def deploy_queue(provider_slug: str) -> str:
+    return f"deploy.{provider_slug}"
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    if name != DEPLOY_TASK or not settings.DEPLOY_PROVIDER_QUEUES:
+        return None
+    provider_slug = kwargs.get("provider_slug") or args[1]
+    return {"queue": deploy_queue(provider_slug)}
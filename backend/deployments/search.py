@@ -0,0 +1,43 @@
+"""
+Busca textual nos logs de deploy, usando o índice full-text criado pela
+migration 0006 (FTS5 no SQLite, GIN/tsvector no PostgreSQL).
+"""
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from deployments.models import Log
+
+
+def _fts5_query(text: str) -> str:
+    # Cada palavra vira uma frase entre aspas, então a sintaxe do FTS5
+    # (AND, NEAR, *, :) digitada pelo usuário é tratada como texto
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+def search_logs(text: str, queryset=None):
+    """
+    Filtra `queryset` (por padrão todos os logs) pelas linhas cuja mensagem
+    contém todas as palavras de `text`. A busca é por palavra inteira, não por
+    trecho. Em bancos sem índice full-text cai num icontains.
+    """
+    queryset = Log.objects.all() if queryset is None else queryset
+    if not text.split():
+        return queryset
+
+    if connection.vendor == "sqlite":
+        return queryset.filter(
+            id__in=RawSQL(
+                "SELECT rowid FROM deployments_log_fts WHERE deployments_log_fts MATCH %s",
+                [_fts5_query(text)],
+            )
+        )
+    if connection.vendor == "postgresql":
+        return queryset.filter(
+            id__in=RawSQL(
+                "SELECT id FROM deployments_log "
+                "WHERE to_tsvector('simple', message) @@ plainto_tsquery('simple', %s)",
+                [text],
+            )
+        )
+    return queryset.filter(message__icontains=text)
@@ -0,0 +1,350 @@
+import hashlib
+import hmac
+from collections import defaultdict
+from datetime import timedelta
+
+from celery import chain, group
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from deployments.models import Deploy, DeployBatch, Log, PendingRedeploy, Provider
+
+
+def create_deploy(
+    github_repo_url: str, providers, ref: str = "", commit_sha: str = ""
+) -> Deploy:
+    """
+    Cria o deploy e seus providers (em andamento) e dispara as tasks depois
+    do commit. Deploys mais antigos do mesmo repositório e ref nesses
+    providers são cancelados (ver supersede_older).
+    """
+    with transaction.atomic():
+        deploy = Deploy.objects.create(
+            github_repo_url=github_repo_url, ref=ref, commit_sha=commit_sha
+        )
+        targets = [(deploy.pk, slug) for slug in dict.fromkeys(providers)]
+        Provider.objects.bulk_create(
+            [
+                Provider(deploy=deploy, slug=slug, status="in_progress")
+                for _, slug in targets
+            ]
+        )
+        supersede_older(targets)
+        transaction.on_commit(lambda: dispatch(targets))
+    return deploy
+
+
+def create_batch(entries) -> DeployBatch:
+    """
+    Cria o lote, os deploys e as linhas de Provider (em andamento) numa única
+    transação, e agenda o disparo das tasks para depois do commit, para que
+    nenhum worker procure um deploy que ainda não foi gravado.
+
+    `entries` é uma lista de dicts com github_repo_url, providers e ref.
+    """
+    with transaction.atomic():
+        batch = DeployBatch.objects.create()
+        deploys = Deploy.objects.bulk_create(
+            [
+                Deploy(
+                    batch=batch,
+                    github_repo_url=entry["github_repo_url"],
+                    ref=entry.get("ref", ""),
+                )
+                for entry in entries
+            ]
+        )
+        targets = [
+            (deploy.pk, slug)
+            for deploy, entry in zip(deploys, entries)
+            for slug in dict.fromkeys(entry["providers"])
+        ]
+        Provider.objects.bulk_create(
+            [
+                Provider(deploy_id=deploy_id, slug=slug, status="in_progress")
+                for deploy_id, slug in targets
+            ]
+        )
+        supersede_older(targets)
+        transaction.on_commit(lambda: dispatch(targets))
+    return batch
+
+
+def request_cancel(providers, reason: str) -> int:
+    """
+    Marca os providers em andamento para cancelamento. O deployer para no
+    próximo limite de fase; os que ainda estão na fila param ao começar.
+    """
+    with transaction.atomic():
+        pending = list(
+            providers.filter(
+                status="in_progress", cancel_requested_at=None
+            ).select_for_update()
+        )
+        Provider.objects.filter(pk__in=[p.pk for p in pending]).update(
+            cancel_requested_at=timezone.now()
+        )
+        Log.objects.bulk_create(
+            [
+                Log(
+                    deploy_id=provider.deploy_id,
+                    provider=provider,
+                    message=f"Cancellation requested: {reason}",
+                    level="warning",
+                )
+                for provider in pending
+            ]
+        )
+    return len(pending)
+
+
+def fail_provider(deploy_id, slug: str, message: str) -> bool:
+    """
+    Marca como down um provider que falhou antes de o deployer assumir (ex.:
+    configuração inválida, Redis dos limites fora do ar) e grava o motivo no
+    log. Não faz nada se o provider já saiu de em andamento.
+    """
+    with transaction.atomic():
+        provider = (
+            Provider.objects.select_for_update()
+            .filter(deploy_id=deploy_id, slug=slug, status="in_progress")
+            .first()
+        )
+        if provider is None:
+            return False
+        provider.status = "down"
+        provider.finished_at = timezone.now()
+        provider.save(update_fields=["status", "finished_at", "updated_at"])
+        Log.objects.create(
+            deploy_id=deploy_id, provider=provider, message=message, level="error"
+        )
+    return True
+
+
+def record_redelivery(deploy_id, slug: str) -> int:
+    """Conta mais uma reentrega da task do provider e retorna o total."""
+    providers = Provider.objects.filter(deploy_id=deploy_id, slug=slug)
+    providers.update(redeliveries=F("redeliveries") + 1)
+    return providers.values_list("redeliveries", flat=True).first() or 0
+
+
+def supersede_older(targets) -> int:
+    """
+    Cancela deploys em andamento do mesmo repositório, ref e provider que
+    sejam anteriores aos novos `targets` ((deploy_id, slug)), já que o
+    resultado deles seria sobrescrito. Deploys de outros branches do mesmo
+    repositório seguem normalmente. Desligável com DEPLOY_SUPERSEDE.
+    """
+    if not settings.DEPLOY_SUPERSEDE or not targets:
+        return 0
+    sources = {
+        pk: (github_repo_url, ref)
+        for pk, github_repo_url, ref in Deploy.objects.filter(
+            pk__in={deploy_id for deploy_id, _ in targets}
+        ).values_list("pk", "github_repo_url", "ref")
+    }
+    newest = {}
+    for deploy_id, slug in targets:
+        key = (*sources[deploy_id], slug)
+        newest[key] = max(newest.get(key, deploy_id), deploy_id)
+
+    older = Q()
+    for (github_repo_url, ref, slug), deploy_id in newest.items():
+        older |= Q(
+            deploy__github_repo_url=github_repo_url,
+            deploy__ref=ref,
+            slug=slug,
+            deploy_id__lt=deploy_id,
+        )
+    return request_cancel(
+        Provider.objects.filter(older),
+        f"superseded by deploy {max(newest.values())}",
+    )
+
+
+def build_lanes(targets, concurrency=None):
+    """
+    Distribui os (deploy_id, provider) em filas sequenciais por provider. Cada
+    provider recebe no máximo `concurrency[slug]` filas, então nunca há mais
+    que esse número de deploys do lote rodando nele ao mesmo tempo.
+    """
+    concurrency = concurrency or settings.DEPLOY_BATCH_CONCURRENCY
+    by_provider = defaultdict(list)
+    for deploy_id, slug in targets:
+        by_provider[slug].append(deploy_id)
+
+    lanes = []
+    for slug, deploy_ids in by_provider.items():
+        width = max(1, min(concurrency.get(slug, 1), len(deploy_ids)))
+        for i in range(width):
+            lanes.append([(deploy_id, slug) for deploy_id in deploy_ids[i::width]])
+    return lanes
+
+
+def dispatch(targets):
+    from deployments.tasks import deploy_to_provider_task
+
+    # Dentro de um lote, deploys que esperam na cadeia também contam como fila
+    now = timezone.now()
+    by_provider = defaultdict(list)
+    for deploy_id, slug in targets:
+        by_provider[slug].append(deploy_id)
+    for slug, deploy_ids in by_provider.items():
+        Provider.objects.filter(slug=slug, deploy_id__in=deploy_ids).update(
+            queued_at=now
+        )
+    # A task não propaga exceções, então uma falha não interrompe a fila
+    group(
+        [
+            chain(
+                *[
+                    deploy_to_provider_task.si(deploy_id, slug)
+                    for deploy_id, slug in lane
+                ]
+            )
+            for lane in build_lanes(targets)
+        ]
+    ).apply_async()
+
+
+def batch_summary(batch: DeployBatch) -> dict:
+    """Contagem de providers por status, no total e por provider."""
+    rows = (
+        Provider.objects.filter(deploy__batch=batch)
+        .values("slug", "status")
+        .annotate(total=Count("id"))
+    )
+    by_status = defaultdict(int)
+    by_provider = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        by_status[row["status"]] += row["total"]
+        by_provider[row["slug"]][row["status"]] += row["total"]
+
+    if by_status["in_progress"]:
+        status = "in_progress"
+    elif by_status["up"] == sum(by_status.values()):
+        status = "up"
+    elif by_status["up"]:
+        status = "partial"
+    elif by_status["down"]:
+        status = "down"
+    else:
+        status = "cancelled"
+
+    return {
+        "status": status,
+        "deploys": batch.deploys.count(),  # type: ignore
+        "providers": dict(by_status),
+        "by_provider": {slug: dict(counts) for slug, counts in by_provider.items()},
+    }
+
+
+def verify_github_signature(secret: str, body: bytes, signature: str) -> bool:
+    """Confere o header X-Hub-Signature-256 (HMAC-SHA256 do corpo)."""
+    if not secret or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.removeprefix("sha256="))
+
+
+def repository_urls(repository: dict) -> set[str]:
+    """Formas em que a URL do repositório do payload pode estar salva."""
+    base = repository["html_url"].rstrip("/")
+    urls = {base, f"{base}/", f"{base}.git"}
+    if repository.get("clone_url"):
+        urls.add(repository["clone_url"])
+    return urls
+
+
+def last_deploy_for_branch(urls, branch: str, default_branch: str):
+    """
+    Último deploy do repositório que publicou esse branch (ou o branch padrão,
+    quando o deploy foi criado sem ref). Define os providers do redeploy.
+    """
+    refs = Q(ref=branch)
+    if branch == default_branch:
+        refs |= Q(ref="")
+    return (
+        Deploy.objects.filter(refs, github_repo_url__in=urls)
+        .order_by("-created_at")
+        .first()
+    )
+
+
+def queue_redeploy(
+    github_repo_url: str, branch: str, commit_sha: str, providers
+) -> PendingRedeploy:
+    """
+    Registra um push. O primeiro push de uma rajada agenda o flush para o fim
+    da janela de debounce; os seguintes só trocam o commit e empurram a
+    janela, até DEPLOY_WEBHOOK_MAX_WAIT depois do primeiro push.
+    """
+    from deployments.tasks import flush_pending_redeploy_task
+
+    now = timezone.now()
+    window = timedelta(seconds=settings.DEPLOY_WEBHOOK_DEBOUNCE)
+    max_wait = timedelta(seconds=settings.DEPLOY_WEBHOOK_MAX_WAIT)
+    with transaction.atomic():
+        pending, created = PendingRedeploy.objects.select_for_update().get_or_create(
+            github_repo_url=github_repo_url,
+            branch=branch,
+            defaults={
+                "commit_sha": commit_sha,
+                "providers": sorted(set(providers)),
+                "first_push_at": now,
+                "due_at": now + window,
+            },
+        )
+        if created:
+            transaction.on_commit(
+                lambda: flush_pending_redeploy_task.apply_async(
+                    (pending.pk,), eta=pending.due_at
+                )
+            )
+        else:
+            pending.commit_sha = commit_sha
+            pending.providers = sorted(set(pending.providers) | set(providers))
+            pending.pushes += 1
+            pending.due_at = min(now + window, pending.first_push_at + max_wait)
+            pending.save()
+    return pending
+
+
+def cancel_redeploy(github_repo_url: str, branch: str):
+    """Descarta o redeploy pendente de um branch apagado."""
+    PendingRedeploy.objects.filter(
+        github_repo_url=github_repo_url, branch=branch
+    ).delete()
+
+
+def flush_redeploy(pending_id) -> Deploy | None:
+    """
+    Cria o deploy do último commit da rajada, se a janela já fechou. Se um
+    push posterior adiou a janela, reagenda o flush para o novo horário.
+    """
+    from deployments.tasks import flush_pending_redeploy_task
+
+    with transaction.atomic():
+        pending = PendingRedeploy.objects.select_for_update().filter(pk=pending_id)
+        pending = pending.first()
+        if pending is None:
+            return None
+        if pending.due_at > timezone.now():
+            due_at = pending.due_at
+            transaction.on_commit(
+                lambda: flush_pending_redeploy_task.apply_async(
+                    (pending_id,), eta=due_at
+                )
+            )
+            return None
+
+        deploy = create_deploy(
+            pending.github_repo_url,
+            pending.providers,
+            ref=pending.branch,
+            commit_sha=pending.commit_sha,
+        )
+        pending.delete()
+    return deploy
@@ -0,0 +1,118 @@
+"""
+Rollups de estatísticas de deploy por provider e por hora/dia.
+
+Os buckets são definidos pelo início do provider (Provider.created_at). A cada
+execução, só os buckets que contêm providers alterados desde a última marca
+d'água são recalculados do zero, então reprocessar um bucket é idempotente.
+"""
+
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from deployments.models import DeployStatRollup, Provider, RollupWatermark
+
+WATERMARK = "deploy_stats"
+PERIODS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# Transações que commitam depois da execução podem ter updated_at anterior à
+# marca d'água; reprocessar uma margem evita perder essas linhas
+OVERLAP = timedelta(minutes=5)
+
+
+def bucket_start(value, period: str):
+    value = timezone.localtime(value, timezone.get_default_timezone())
+    if period == "day":
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def p95(values: list[float]) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+def recompute_bucket(period: str, start) -> int:
+    """Recalcula um bucket para todos os providers. Retorna quantas linhas gravou."""
+    rows = Provider.objects.filter(
+        created_at__gte=start, created_at__lt=start + PERIODS[period]
+    ).values_list("slug", "status", "created_at", "finished_at")
+
+    counts = defaultdict(lambda: {"started": 0, "succeeded": 0, "failed": 0})
+    durations = defaultdict(list)
+    for slug, status, created_at, finished_at in rows:
+        counts[slug]["started"] += 1
+        if status == "up":
+            counts[slug]["succeeded"] += 1
+        elif status == "down":
+            counts[slug]["failed"] += 1
+        if finished_at is not None:
+            durations[slug].append((finished_at - created_at).total_seconds())
+
+    with transaction.atomic():
+        DeployStatRollup.objects.filter(period=period, bucket_start=start).exclude(
+            provider__in=list(counts)
+        ).delete()
+        for slug, values in counts.items():
+            slug_durations = durations[slug]
+            DeployStatRollup.objects.update_or_create(
+                period=period,
+                bucket_start=start,
+                provider=slug,
+                defaults={
+                    **values,
+                    "mean_duration": (
+                        sum(slug_durations) / len(slug_durations)
+                        if slug_durations
+                        else None
+                    ),
+                    "p95_duration": p95(slug_durations),
+                },
+            )
+    return len(counts)
+
+
+def recompute(created_ats) -> int:
+    """Recalcula os buckets (de todos os períodos) que contêm esses horários."""
+    buckets = {
+        (period, bucket_start(value, period))
+        for value in created_ats
+        for period in PERIODS
+    }
+    for period, start in sorted(buckets):
+        recompute_bucket(period, start)
+    return len(buckets)
+
+
+def refresh_rollups() -> int:
+    """
+    Atualiza os buckets afetados por providers criados ou alterados desde a
+    última execução. Retorna quantos buckets foram recalculados.
+    """
+    now = timezone.now()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    changed = Provider.objects.all()
+    if watermark is not None:
+        changed = changed.filter(updated_at__gt=watermark.value - OVERLAP)
+    total = recompute(changed.values_list("created_at", flat=True).iterator())
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={"value": now})
+    return total
+
+
+def backfill(since=None) -> int:
+    """Recalcula todos os buckets a partir dos providers existentes."""
+    providers = Provider.objects.all()
+    if since is not None:
+        providers = providers.filter(created_at__gte=since)
+    now = timezone.now()
+    total = recompute(providers.values_list("created_at", flat=True).iterator())
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={"value": now})
+    return total
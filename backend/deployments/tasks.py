@@ -1,31 +1,101 @@
 from celery import shared_task
+from celery.exceptions import Retry, SoftTimeLimitExceeded
+from django.conf import settings
 from django.utils import timezone
 
+from deployments.deployers.base import DeployCancelled
 from deployments.deployers.factory import DeployerFactory
+from deployments.metrics import DEPLOY_SLOT_DEFERRALS, track_task
 from deployments.models import Deploy
+from deployments.services import fail_provider, record_redelivery
+from deployments.throttling import acquire_deploy_slot
 
 
-@shared_task
-def deploy_to_provider_task(deploy_id, provider_slug):
+@shared_task(
+    bind=True,
+    # Só confirma a mensagem no fim: se o worker morrer no meio, ela volta para
+    # a fila e o deploy continua do último checkpoint (até
+    # DEPLOY_TASK_MAX_RETRIES reentregas)
+    acks_late=True,
+    reject_on_worker_lost=True,
+    soft_time_limit=settings.CELERY_TASK_TIME_LIMIT - 60,
+    max_retries=settings.DEPLOY_TASK_MAX_RETRIES,
+)
+def deploy_to_provider_task(self, deploy_id, provider_slug, deferrals=0):
     """
     Task para fazer deploy em um provider específico.
-    Roda de forma assíncrona para cada provider selecionado.
+    Roda de forma assíncrona para cada provider selecionado, na fila do
+    provider (ver deployments.routing).
     """
-    try:
-        deploy = Deploy.objects.get(pk=deploy_id)
+    with track_task("deploy_to_provider_task") as run:
+        deployer = None
+        try:
+            deploy = Deploy.objects.get(pk=deploy_id)
+
+            # Uma mensagem reentregue é um worker que morreu no meio do deploy
+            # (ex.: sem memória). Sem limite, um deploy que derruba o worker
+            # voltaria para a fila para sempre
+            if (self.request.delivery_info or {}).get("redelivered"):
+                redeliveries = record_redelivery(deploy_id, provider_slug)
+                if redeliveries > self.max_retries:
+                    run.fail()
+                    fail_provider(
+                        deploy_id,
+                        provider_slug,
+                        f"Worker lost {redeliveries} times during deployment",
+                    )
+                    return (
+                        f"Deploy {deploy_id} abandoned on {provider_slug} "
+                        f"after {redeliveries} redeliveries"
+                    )
 
-        # Cria o deployer específico para o provider
-        deployer = DeployerFactory.create_deployer(provider_slug, deploy)
+            # Cria o deployer específico para o provider
+            deployer = DeployerFactory.create_deployer(provider_slug, deploy)
 
-        # Executa o deployment
-        deployer.execute_deployment()
+            # Sem slot livre no limite de concorrência do provider ou da conta,
+            # a task volta para a fila com backoff. Esses adiamentos não contam
+            # como retries do time limit
+            slot = acquire_deploy_slot(provider_slug, deployer.account)
+            if slot is None:
+                DEPLOY_SLOT_DEFERRALS.labels(provider=provider_slug).inc()
+                raise self.retry(
+                    kwargs={"deferrals": deferrals + 1},
+                    countdown=max(1.0, deployer.backoff.delay(deferrals)),
+                    max_retries=None,
+                )
 
-        return f"Deploy {deploy_id} completed successfully on {provider_slug}"
+            # Executa o deployment
+            try:
+                deployer.execute_deployment()
+            finally:
+                slot.release()
 
-    except Deploy.DoesNotExist:
-        return f"Deploy {deploy_id} not found"
-    except Exception as e:
-        return f"Deploy {deploy_id} failed on {provider_slug}: {str(e)}"
+            return f"Deploy {deploy_id} completed successfully on {provider_slug}"
+
+        except Retry:
+            raise
+        except Deploy.DoesNotExist:
+            run.fail()
+            return f"Deploy {deploy_id} not found"
+        except DeployCancelled:
+            return f"Deploy {deploy_id} cancelled on {provider_slug}"
+        except SoftTimeLimitExceeded:
+            run.fail()
+            if self.request.retries - deferrals >= self.max_retries:
+                message = f"Deployment timed out after {self.max_retries + 1} attempts"
+                if deployer is not None:
+                    deployer.fail(message)
+                else:
+                    fail_provider(deploy_id, provider_slug, message)
+                return f"Deploy {deploy_id} timed out on {provider_slug}"
+            # Retenta a partir do checkpoint salvo pelo deployer
+            raise self.retry(countdown=5, max_retries=None)
+        except Exception as e:
+            run.fail()
+            # Erros antes do execute_deployment (deployer, limites) não passam
+            # pelo fail() do deployer; sem isso o provider ficaria em andamento
+            fail_provider(deploy_id, provider_slug, f"Deployment failed: {str(e)}")
+            return f"Deploy {deploy_id} failed on {provider_slug}: {str(e)}"
 
 
 @shared_task
@@ -34,21 +104,61 @@ def cleanup_deployment_task(deploy_id):
     Task para limpeza final após todos os deployments terminarem.
     Pode ser usada para notificações, atualizações de status final, etc.
     """
-    try:
-        deploy = Deploy.objects.get(pk=deploy_id)
+    with track_task("cleanup_deployment_task") as run:
+        try:
+            deploy = Deploy.objects.get(pk=deploy_id)
+
+            # Verifica se todos os providers terminaram
+            providers = deploy.providers.all()  # type: ignore
+            all_completed = all(
+                provider.status in ["up", "down", "cancelled"] for provider in providers
+            )
 
-        # Verifica se todos os providers terminaram
-        providers = deploy.providers.all()  # type: ignore
-        all_completed = all(provider.status in ["up", "down"] for provider in providers)
+            if all_completed:
+                # Atualiza timestamp de conclusão
+                deploy.completed_at = timezone.now()
+                deploy.save()
 
-        if all_completed:
-            # Atualiza timestamp de conclusão
-            deploy.completed_at = timezone.now()
-            deploy.save()
+            return f"Cleanup completed for deploy {deploy_id}"
 
-        return f"Cleanup completed for deploy {deploy_id}"
+        except Deploy.DoesNotExist:
+            run.fail()
+            return f"Deploy {deploy_id} not found for cleanup"
+        except Exception as e:
+            run.fail()
+            return f"Cleanup failed for deploy {deploy_id}: {str(e)}"
+
+
+@shared_task
+def flush_pending_redeploy_task(pending_id):
+    """
+    Task agendada para o fim da janela de debounce do webhook do GitHub.
+    Cria o deploy do último commit recebido para o branch.
+    """
+    from deployments.services import flush_redeploy
+
+    with track_task("flush_pending_redeploy_task") as run:
+        try:
+            deploy = flush_redeploy(pending_id)
+            if deploy is None:
+                return f"Redeploy {pending_id} not due yet or already flushed"
+            return f"Redeploy {pending_id} created deploy {deploy.pk}"
+        except Exception as e:
+            run.fail()
+            return f"Redeploy {pending_id} failed: {str(e)}"
+
+
+@shared_task
+def rollup_deploy_stats_task():
+    """
+    Task periódica (Celery beat) que atualiza as rollups de estatísticas com
+    os providers alterados desde a última execução.
+    """
+    from deployments.stats import refresh_rollups
 
-    except Deploy.DoesNotExist:
-        return f"Deploy {deploy_id} not found for cleanup"
-    except Exception as e:
-        return f"Cleanup failed for deploy {deploy_id}: {str(e)}"
+    with track_task("rollup_deploy_stats_task") as run:
+        try:
+            return f"Recomputed {refresh_rollups()} stat buckets"
+        except Exception as e:
+            run.fail()
+            return f"Stats rollup failed: {str(e)}"
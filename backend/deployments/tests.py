@@ -1,3 +1,1308 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import wait
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import boto3
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from deployments import stats
+from deployments.api.serializers import DeployCreateSerializer
+from deployments.benchmarks.runner import STUBS, mismatched_params, run_provider
+from deployments.benchmarks.stubs import (
+    FakeObjectStorageClient,
+    FakeResourceManagerClient,
+    stubbed_oci,
+)
+from deployments.deployers import delta_loader
+from deployments.deployers.aws import AWSDeployer
+from deployments.deployers.backoff import BackoffPolicy
+from deployments.deployers.base import BaseDeployer, DeployCancelled
+from deployments.deployers.delta import (
+    BlobStore,
+    blob_key,
+    build_manifest,
+    upload_delta,
+)
+from deployments.deployers.oracle import OracleDeployer
+from deployments.deployers.packaging import IgnoreMatcher, file_digest
+from deployments.deployers.pipeline import Pipeline
+from deployments.metrics import CLOUD_API_CALL_DURATION, CeleryQueueCollector
+from deployments.models import (
+    Deploy,
+    DeployBatch,
+    DeployStatRollup,
+    Log,
+    PendingRedeploy,
+    Provider,
+    RollupWatermark,
+)
+from deployments.services import (
+    batch_summary,
+    build_lanes,
+    create_batch,
+    create_deploy,
+    flush_redeploy,
+    queue_redeploy,
+    request_cancel,
+    verify_github_signature,
+)
+from deployments.tasks import deploy_to_provider_task
+
+
+class StubDeployer:
+    """Only what Pipeline uses from a deployer: `phase()`."""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        self.phases.append(name)
+        yield
+
+
+class PipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.deployer = StubDeployer()
+
+    def pipeline(self):
+        return Pipeline(self.deployer, max_workers=4)
+
+    def test_unknown_dependency(self):
+        pipeline = self.pipeline().step("a", lambda missing: None, requires=["missing"])
+        with self.assertRaisesMessage(ValueError, "requires unknown steps"):
+            pipeline.run()
+        self.assertEqual(self.deployer.phases, [])
+
+    def test_cycle(self):
+        pipeline = (
+            self.pipeline()
+            .step("root", lambda: None)
+            .step("a", lambda b: None, requires=["b"])
+            .step("b", lambda a: None, requires=["a"])
+        )
+        with self.assertRaisesMessage(ValueError, "Dependency cycle between steps"):
+            pipeline.run()
+        self.assertEqual(self.deployer.phases, [])
+
+    def test_duplicate_step(self):
+        pipeline = self.pipeline().step("a", lambda: None)
+        with self.assertRaises(ValueError):
+            pipeline.step("a", lambda: None)
+
+    def test_results_are_passed_to_dependents(self):
+        results = (
+            self.pipeline()
+            .step("a", lambda: 2)
+            .step("b", lambda: 3)
+            .step("sum", lambda a, b: a + b, requires=["a", "b"])
+            .step("double", lambda sum: sum * 2, requires=["sum"])
+            .run()
+        )
+        self.assertEqual(results, {"a": 2, "b": 3, "sum": 5, "double": 10})
+        self.assertEqual(set(self.deployer.phases), {"a", "b", "sum", "double"})
+        self.assertEqual(self.deployer.phases[-1], "double")
+
+    def test_independent_steps_overlap(self):
+        # Each step waits for the other, so this only finishes if both run
+        # at the same time
+        barrier = threading.Barrier(2, timeout=5)
+        self.pipeline().step("a", barrier.wait).step("b", barrier.wait).run()
+
+    def test_failure_stops_new_steps_and_reraises_first_error(self):
+        started = []
+        release = threading.Event()
+
+        def fail():
+            started.append("fail")
+            # The slow step only ends once the failure happened
+            release.set()
+            raise RuntimeError("first")
+
+        def slow():
+            started.append("slow")
+            release.wait(5)
+            raise KeyError("second")
+
+        pipeline = (
+            self.pipeline()
+            .step("fail", fail)
+            .step("slow", slow)
+            .step("after", lambda fail: started.append("after"), requires=["fail"])
+            .step(
+                "independent",
+                lambda slow: started.append("independent"),
+                requires=["slow"],
+            )
+        )
+        with self.assertRaisesMessage(RuntimeError, "first"):
+            pipeline.run()
+        self.assertCountEqual(started, ["fail", "slow"])
+
+    def interrupt_first_wait(self):
+        """Stands in for the soft time limit firing in the main thread."""
+        real_wait = wait
+        calls = []
+
+        def interrupt(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise SoftTimeLimitExceeded()
+            return real_wait(*args, **kwargs)
+
+        return mock.patch("deployments.deployers.pipeline.wait", side_effect=interrupt)
+
+    def test_interruption_waits_for_running_steps_within_the_timeout(self):
+        finished = threading.Event()
+
+        def upload():
+            time.sleep(0.2)
+            finished.set()
+
+        pipeline = (
+            Pipeline(self.deployer, max_workers=4, stop_timeout=5)
+            .step("upload", upload)
+            .step("stack", lambda upload: None, requires=["upload"])
+        )
+        with self.interrupt_first_wait(), self.assertRaises(SoftTimeLimitExceeded):
+            pipeline.run()
+        self.assertTrue(finished.is_set())
+        self.assertNotIn("stack", self.deployer.phases)
+
+    def test_interruption_does_not_wait_past_the_timeout(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        pipeline = (
+            Pipeline(self.deployer, max_workers=4, stop_timeout=0.1)
+            .step("upload", lambda: release.wait(10))
+            .step("stack", lambda upload: None, requires=["upload"])
+        )
+        start = time.monotonic()
+        with self.interrupt_first_wait(), self.assertRaises(SoftTimeLimitExceeded):
+            pipeline.run()
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertNotIn("stack", self.deployer.phases)
+
+
+class GitRefValidationTests(SimpleTestCase):
+    def test_refs(self):
+        cases = [
+            ("", True),
+            ("main", True),
+            ("feature/login", True),
+            ("v2.1.0", True),
+            ("refs/heads/main", True),
+            ("3f9a1c0e" * 5, True),
+            ("3F9A1C0E" * 5, True),
+            ("3f9a1c0", False),
+            ("3f9a1c0e" * 4, False),
+            ("v3f9a1c0", True),
+            ("-x", False),
+            ("--upload-pack=touch /tmp/x", False),
+            ("a..b", False),
+            ("a b", False),
+            ("a~1", False),
+            ("a@{1}", False),
+            ("a//b", False),
+            ("feature/.hidden", False),
+            ("branch.lock", False),
+            ("branch/", False),
+            ("@", False),
+        ]
+        for ref, valid in cases:
+            with self.subTest(ref=ref):
+                serializer = DeployCreateSerializer(
+                    data={
+                        "github_repo_url": "https://github.com/org/app",
+                        "ref": ref,
+                        "providers": ["aws"],
+                    }
+                )
+                self.assertEqual(serializer.is_valid(), valid, serializer.errors)
+                if not valid:
+                    self.assertIn("ref", serializer.errors)
+
+
+class IgnoreMatcherTests(SimpleTestCase):
+    def assertMatches(self, patterns, cases):
+        matcher = IgnoreMatcher(patterns)
+        for path, ignored in cases:
+            with self.subTest(patterns=patterns, path=path):
+                self.assertEqual(matcher.matches(path), ignored)
+
+    def test_patterns_are_anchored_at_the_root(self):
+        self.assertMatches(
+            ["node_modules"],
+            [
+                ("node_modules", True),
+                ("node_modules/lib/index.js", True),
+                ("src/node_modules", False),
+                ("node_modules_old", False),
+            ],
+        )
+        self.assertMatches(["/build"], [("build/app.js", True), ("src/build", False)])
+
+    def test_wildcards_do_not_cross_directories(self):
+        self.assertMatches(["*.md"], [("README.md", True), ("docs/guide.md", False)])
+        self.assertMatches(["te?t"], [("test", True), ("tet", False), ("te/t", False)])
+
+    def test_double_star(self):
+        self.assertMatches(
+            ["**/*.log"],
+            [
+                ("debug.log", True),
+                ("logs/debug.log", True),
+                ("a/b/c/debug.log", True),
+                ("debug.logs", False),
+            ],
+        )
+        self.assertMatches(
+            ["a/**/b"], [("a/b", True), ("a/x/y/b", True), ("a/x/b/file", True)]
+        )
+
+    def test_trailing_slash(self):
+        self.assertMatches(
+            ["docs/"], [("docs", True), ("docs/index.md", True), ("src/docs", False)]
+        )
+
+    def test_comments_and_blank_lines(self):
+        self.assertMatches(["# secret", "", "   "], [("# secret", False)])
+
+    def test_negation_reincludes_and_last_rule_wins(self):
+        self.assertMatches(
+            ["*.md", "!README.md"],
+            [("CHANGELOG.md", True), ("README.md", False)],
+        )
+        self.assertMatches(
+            ["docs", "!docs/keep.md"],
+            [("docs/drafts.md", True), ("docs/keep.md", False)],
+        )
+        self.assertMatches(["!README.md", "*.md"], [("README.md", True)])
+
+    def test_pruning(self):
+        cases = [
+            (["node_modules"], "node_modules", True),
+            (["node_modules"], "src", False),
+            # A negation below the directory needs it to be walked
+            (["docs", "!docs/keep.md"], "docs", False),
+            (["node_modules", "build", "!build/keep"], "node_modules", True),
+            (["node_modules", "build", "!build/keep"], "build", False),
+            # A negation without a literal prefix could match anywhere
+            (["vendor", "!**/*.keep"], "vendor", False),
+            (["*", "!src"], "docs", True),
+        ]
+        for patterns, directory, prunable in cases:
+            with self.subTest(patterns=patterns, directory=directory):
+                self.assertEqual(IgnoreMatcher(patterns).can_prune(directory), prunable)
+
+    def test_defaults_and_ignore_files(self):
+        with tempfile.TemporaryDirectory() as root:
+            Path(root, ".dockerignore").write_text("dist\n")
+            Path(root, ".deployignore").write_text("*.env\n!public.env\n")
+            matcher = IgnoreMatcher.from_directory(root)
+        for path, ignored in [
+            (".git/HEAD", True),
+            ("app/__pycache__/views.cpython-313.pyc", True),
+            ("dist/bundle.js", True),
+            ("prod.env", True),
+            ("public.env", False),
+            ("app/views.py", False),
+        ]:
+            with self.subTest(path=path):
+                self.assertEqual(matcher.matches(path), ignored)
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class FakeBlobStore(BlobStore):
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        self.puts = []
+        self.lock = threading.Lock()
+
+    def exists(self, key):
+        return key in self.objects
+
+    def put_file(self, key, path):
+        self.put_bytes(key, Path(path).read_bytes())
+
+    def put_bytes(self, key, data):
+        with self.lock:
+            self.objects[key] = data
+            self.puts.append(key)
+
+    def read(self, key):
+        # The loader's reader interface
+        return self.objects[key]
+
+
+class DeltaUploadTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.files = {
+            "app.py": b"print('hi')\n",
+            "static/logo.txt": b"logo",
+            "static/copy.txt": b"logo",
+            "bin/run.sh": b"#!/bin/sh\n",
+            "debug.log": b"ignored",
+        }
+        for path, data in self.files.items():
+            (self.root / path).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / path).write_bytes(data)
+        (self.root / "bin/run.sh").chmod(0o755)
+        self.manifest = build_manifest(self.root, IgnoreMatcher(["*.log"]), deploy=7)
+
+    def test_build_manifest(self):
+        self.assertEqual(self.manifest["version"], 1)
+        self.assertEqual(self.manifest["blob_prefix"], "blobs/sha256")
+        self.assertEqual(self.manifest["deploy"], 7)
+        self.assertEqual(
+            [
+                (entry["path"], entry["sha256"], entry["size"], entry["executable"])
+                for entry in self.manifest["files"]
+            ],
+            [
+                (path, sha256(data), len(data), path == "bin/run.sh")
+                for path, data in sorted(self.files.items())
+                if path != "debug.log"
+            ],
+        )
+
+    def test_upload_skips_existing_and_duplicate_blobs(self):
+        existing = blob_key(sha256(b"print('hi')\n"))
+        store = FakeBlobStore({existing: b"print('hi')\n"})
+
+        report = upload_delta(store, self.root, self.manifest, "7/manifest.json")
+
+        self.assertEqual((report.files, report.blobs), (4, 3))
+        self.assertEqual((report.uploaded, report.uploaded_bytes), (2, 14))
+        self.assertNotIn(existing, store.puts)
+        self.assertCountEqual(
+            store.puts[:-2],
+            [blob_key(sha256(b"logo")), blob_key(sha256(b"#!/bin/sh\n"))],
+        )
+        # The manifest only goes up once every blob it points at is there
+        self.assertEqual(store.puts[-2:], ["7/manifest.json", "7/delta_loader.py"])
+        self.assertEqual(json.loads(store.objects["7/manifest.json"]), self.manifest)
+
+    def test_loader_assembles_the_tree(self):
+        store = FakeBlobStore()
+        upload_delta(store, self.root, self.manifest, "7/manifest.json")
+        with tempfile.TemporaryDirectory() as dest:
+            paths = delta_loader.assemble(store, self.manifest, dest)
+            self.assertCountEqual(paths, [f["path"] for f in self.manifest["files"]])
+            for path in paths:
+                self.assertEqual(Path(dest, path).read_bytes(), self.files[path])
+            self.assertTrue(os.access(Path(dest, "bin/run.sh"), os.X_OK))
+
+    def test_loader_rejects_unsafe_paths(self):
+        store = FakeBlobStore({blob_key(sha256(b"x")): b"x"})
+        for path in ["/etc/passwd", "../outside", "app/../../outside"]:
+            with self.subTest(path=path), tempfile.TemporaryDirectory() as dest:
+                manifest = {
+                    "blob_prefix": "blobs/sha256",
+                    "files": [{"path": path, "sha256": sha256(b"x")}],
+                }
+                with self.assertRaisesMessage(ValueError, "Unsafe path"):
+                    delta_loader.assemble(store, manifest, dest)
+                self.assertEqual(os.listdir(dest), [])
+
+    def test_loader_rejects_hash_mismatch(self):
+        digest = sha256(b"expected")
+        store = FakeBlobStore({blob_key(digest): b"tampered"})
+        manifest = {
+            "blob_prefix": "blobs/sha256",
+            "files": [{"path": "app.py", "sha256": digest}],
+        }
+        with tempfile.TemporaryDirectory() as dest:
+            with self.assertRaisesMessage(ValueError, "Corrupted blob for app.py"):
+                delta_loader.assemble(store, manifest, dest)
+            self.assertEqual(os.listdir(dest), [])
+
+
+WEBHOOK_SECRET = "s3cret"
+REPO_URL = "https://github.com/org/app"
+
+
+def sign(body: bytes, secret: str = WEBHOOK_SECRET) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class GitHubSignatureTests(SimpleTestCase):
+    def test_signatures(self):
+        body = b'{"ref": "refs/heads/main"}'
+        cases = [
+            (WEBHOOK_SECRET, sign(body), True),
+            (WEBHOOK_SECRET, sign(body, "other"), False),
+            (WEBHOOK_SECRET, sign(body + b" "), False),
+            (WEBHOOK_SECRET, sign(body).removeprefix("sha256="), False),
+            (WEBHOOK_SECRET, "", False),
+            # Without a configured secret every request is refused
+            ("", sign(body, ""), False),
+        ]
+        for secret, signature, valid in cases:
+            with self.subTest(secret=secret, signature=signature):
+                self.assertEqual(
+                    verify_github_signature(secret, body, signature), valid
+                )
+
+
+@override_settings(DEPLOY_WEBHOOK_DEBOUNCE=60, DEPLOY_WEBHOOK_MAX_WAIT=300)
+@mock.patch("deployments.tasks.flush_pending_redeploy_task.apply_async")
+class RedeployDebounceTests(TestCase):
+    def setUp(self):
+        self.now = datetime(2025, 1, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+    def at(self, seconds):
+        return mock.patch(
+            "django.utils.timezone.now",
+            return_value=self.now + timedelta(seconds=seconds),
+        )
+
+    def push(self, seconds, commit_sha, providers=("aws",)):
+        with self.at(seconds), self.captureOnCommitCallbacks(execute=True):
+            return queue_redeploy(REPO_URL, "main", commit_sha, providers)
+
+    def test_pushes_are_coalesced(self, apply_async):
+        self.push(0, "a" * 40)
+        self.push(10, "b" * 40, providers=["oracle"])
+        pending = self.push(20, "c" * 40)
+
+        self.assertEqual(PendingRedeploy.objects.count(), 1)
+        self.assertEqual(pending.commit_sha, "c" * 40)
+        self.assertEqual(pending.pushes, 3)
+        self.assertEqual(pending.providers, ["aws", "oracle"])
+        self.assertEqual(pending.due_at, self.now + timedelta(seconds=80))
+        # Only the first push schedules a flush
+        apply_async.assert_called_once_with(
+            (pending.pk,), eta=self.now + timedelta(seconds=60)
+        )
+
+    def test_due_at_is_capped_by_max_wait(self, apply_async):
+        for seconds in range(0, 400, 50):
+            pending = self.push(seconds, f"{seconds:040d}")
+        self.assertEqual(pending.due_at, self.now + timedelta(seconds=300))
+
+    @mock.patch("deployments.services.dispatch")
+    def test_flush_reschedules_when_due_at_moved(self, dispatch, apply_async):
+        pending = self.push(0, "a" * 40)
+        self.push(30, "b" * 40)
+        apply_async.reset_mock()
+
+        # The flush scheduled for t=60 runs before the window that now ends at
+        # t=90, so it only reschedules itself
+        with self.at(60), self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(flush_redeploy(pending.pk))
+        apply_async.assert_called_once_with(
+            (pending.pk,), eta=self.now + timedelta(seconds=90)
+        )
+        self.assertTrue(PendingRedeploy.objects.filter(pk=pending.pk).exists())
+
+        with self.at(90), self.captureOnCommitCallbacks(execute=True):
+            deploy = flush_redeploy(pending.pk)
+        self.assertEqual(deploy.commit_sha, "b" * 40)
+        self.assertEqual(deploy.ref, "main")
+        self.assertFalse(PendingRedeploy.objects.exists())
+        dispatch.assert_called_once_with([(deploy.pk, "aws")])
+
+        # A flush that was already handled is a no-op
+        self.assertIsNone(flush_redeploy(pending.pk))
+
+
+@override_settings(GITHUB_WEBHOOK_SECRET=WEBHOOK_SECRET)
+@mock.patch("deployments.tasks.flush_pending_redeploy_task.apply_async")
+class GitHubWebhookViewTests(TestCase):
+    url = "/api/webhooks/github/"
+
+    def setUp(self):
+        deploy = Deploy.objects.create(github_repo_url=REPO_URL, ref="main")
+        Provider.objects.create(deploy=deploy, slug="aws", status="up")
+
+    def post(self, payload, event="push", signature=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        return self.client.post(
+            self.url,
+            body,
+            content_type="application/json",
+            headers={
+                "X-GitHub-Event": event,
+                "X-Hub-Signature-256": signature or sign(body),
+            },
+        )
+
+    def payload(self, **overrides):
+        return {
+            "ref": "refs/heads/main",
+            "after": "a" * 40,
+            "repository": {"html_url": REPO_URL, "default_branch": "main"},
+            **overrides,
+        }
+
+    def test_bad_signature(self, apply_async):
+        response = self.post(self.payload(), signature=sign(b"other"))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(PendingRedeploy.objects.exists())
+
+    def test_push_queues_redeploy(self, apply_async):
+        response = self.post(self.payload())
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["providers"], ["aws"])
+        self.assertTrue(PendingRedeploy.objects.filter(branch="main").exists())
+
+    def test_deleted_branch_drops_pending_redeploy(self, apply_async):
+        self.post(self.payload())
+        response = self.post(self.payload(deleted=True, after="0" * 40))
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(PendingRedeploy.objects.exists())
+
+    def test_invalid_payloads(self, apply_async):
+        cases = [
+            b"not json",
+            [],
+            {"ref": "refs/heads/main"},
+            self.payload(repository={"name": "app"}),
+            self.payload(repository="org/app"),
+            self.payload(repository={"html_url": 1}),
+            self.payload(ref=["refs/heads/main"]),
+            self.payload(after=None),
+        ]
+        for payload in cases:
+            with self.subTest(payload=payload):
+                response = self.post(payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data["detail"], "Invalid push payload")
+
+
+@mock.patch("deployments.services.dispatch")
+class CancellationTests(TestCase):
+    def provider(self, slug="aws", status="in_progress", **deploy):
+        deploy = Deploy.objects.create(**{"github_repo_url": REPO_URL, **deploy})
+        return Provider.objects.create(deploy=deploy, slug=slug, status=status)
+
+    def cancel_requested(self):
+        return set(
+            Provider.objects.filter(cancel_requested_at__isnull=False).values_list(
+                "pk", flat=True
+            )
+        )
+
+    def test_request_cancel_only_marks_running_providers_once(self, dispatch):
+        running = self.provider()
+        self.provider(slug="oracle", status="up")
+        providers = Provider.objects.all()
+
+        self.assertEqual(request_cancel(providers, "manual"), 1)
+        self.assertEqual(request_cancel(providers, "manual"), 0)
+        self.assertEqual(self.cancel_requested(), {running.pk})
+        self.assertEqual(
+            list(Log.objects.values_list("provider", "level", "message")),
+            [(running.pk, "warning", "Cancellation requested: manual")],
+        )
+
+    def test_new_deploy_supersedes_same_repo_ref_and_provider(self, dispatch):
+        older = self.provider(ref="main")
+        other_provider = self.provider(slug="oracle", ref="main")
+        self.provider(ref="feature/login")
+        self.provider(ref="main", github_repo_url="https://github.com/org/api")
+        self.provider(ref="main", status="up")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deploy = create_deploy(REPO_URL, ["aws"], ref="main")
+
+        self.assertEqual(self.cancel_requested(), {older.pk})
+        message = f"Cancellation requested: superseded by deploy {deploy.pk}"
+        self.assertTrue(Log.objects.filter(provider=older, message=message).exists())
+        other_provider.refresh_from_db()
+        self.assertIsNone(other_provider.cancel_requested_at)
+
+    @override_settings(DEPLOY_SUPERSEDE=False)
+    def test_supersede_can_be_disabled(self, dispatch):
+        self.provider(ref="main")
+        create_deploy(REPO_URL, ["aws"], ref="main")
+        self.assertEqual(self.cancel_requested(), set())
+
+    def test_deployer_stops_at_the_next_phase(self, dispatch):
+        TimingOutDeployer.attempts = 0
+        provider = self.provider()
+        deployer = TimingOutDeployer(provider.deploy)
+        deployer.provider = provider
+        deployer.check_cancelled()
+
+        request_cancel(Provider.objects.filter(pk=provider.pk), "manual")
+        with self.assertRaises(DeployCancelled):
+            deployer.execute_deployment()
+        provider.refresh_from_db()
+        self.assertEqual(provider.status, "cancelled")
+        self.assertEqual(TimingOutDeployer.attempts, 0)
+
+
+@mock.patch("deployments.services.dispatch")
+class DeployBatchTests(TestCase):
+    url = "/api/deployments/batch/"
+
+    def entry(self, repo="app", providers=("aws",)):
+        return {
+            "github_repo_url": f"https://github.com/org/{repo}",
+            "providers": list(providers),
+        }
+
+    def test_build_lanes(self, dispatch):
+        targets = [(1, "aws"), (2, "aws"), (3, "aws"), (4, "oracle"), (5, "gcp")]
+        self.assertEqual(
+            build_lanes(targets, {"aws": 2, "oracle": 4}),
+            [
+                [(1, "aws"), (3, "aws")],
+                [(2, "aws")],
+                # Never more lanes than deploys, and one by default
+                [(4, "oracle")],
+                [(5, "gcp")],
+            ],
+        )
+        self.assertEqual(
+            build_lanes(targets[:3], {"aws": 0}), [[(1, "aws"), (2, "aws"), (3, "aws")]]
+        )
+
+    def test_create_batch(self, dispatch):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url,
+                {
+                    "deployments": [
+                        self.entry("web", ["aws", "oracle", "aws"]),
+                        self.entry("api"),
+                    ]
+                },
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 201)
+        web, api = response.data["deploys"]
+        self.assertEqual(
+            response.data["summary"],
+            {
+                "status": "in_progress",
+                "deploys": 2,
+                "providers": {"in_progress": 3},
+                "by_provider": {
+                    "aws": {"in_progress": 2},
+                    "oracle": {"in_progress": 1},
+                },
+            },
+        )
+        dispatch.assert_called_once_with([(web, "aws"), (web, "oracle"), (api, "aws")])
+
+    def test_batch_size_limit(self, dispatch):
+        limit = settings.DEPLOY_BATCH_MAX_SIZE
+        for entries, status_code in [(0, 400), (limit + 1, 400), (limit, 201)]:
+            with self.subTest(entries=entries):
+                response = self.client.post(
+                    self.url,
+                    {"deployments": [self.entry(str(i)) for i in range(entries)]},
+                    content_type="application/json",
+                )
+                self.assertEqual(response.status_code, status_code)
+        self.assertEqual(DeployBatch.objects.count(), 1)
+        self.assertEqual(Deploy.objects.count(), limit)
+
+    def test_summary_status(self, dispatch):
+        cases = [
+            (["in_progress", "up"], "in_progress"),
+            (["up", "up"], "up"),
+            (["up", "down"], "partial"),
+            (["up", "cancelled"], "partial"),
+            (["down", "cancelled"], "down"),
+            (["cancelled", "cancelled"], "cancelled"),
+        ]
+        for statuses, expected in cases:
+            with self.subTest(statuses=statuses):
+                batch = create_batch([self.entry(providers=["aws", "oracle"])])
+                for provider, status in zip(
+                    Provider.objects.filter(deploy__batch=batch).order_by("slug"),
+                    statuses,
+                ):
+                    provider.status = status
+                    provider.save()
+                summary = batch_summary(batch)
+                self.assertEqual(summary["status"], expected)
+                self.assertEqual(
+                    summary["by_provider"],
+                    {"aws": {statuses[0]: 1}, "oracle": {statuses[1]: 1}},
+                )
+
+
+class DeployStatsRollupTests(TestCase):
+    def setUp(self):
+        self.hour = datetime(2025, 1, 1, 10, 0, tzinfo=dt_timezone.utc)
+
+    def provider(self, slug, status, minute, duration=None):
+        deploy = Deploy.objects.create(github_repo_url=REPO_URL)
+        provider = Provider.objects.create(deploy=deploy, slug=slug)
+        created_at = self.hour + timedelta(minutes=minute)
+        Provider.objects.filter(pk=provider.pk).update(
+            status=status,
+            created_at=created_at,
+            finished_at=duration and created_at + timedelta(seconds=duration),
+            updated_at=created_at,
+        )
+        return provider
+
+    def rollups(self, period):
+        return {
+            (rollup.bucket_start, rollup.provider): (
+                rollup.started,
+                rollup.succeeded,
+                rollup.failed,
+                rollup.mean_duration,
+                rollup.p95_duration,
+            )
+            for rollup in DeployStatRollup.objects.filter(period=period)
+        }
+
+    def changed(self, provider, ago, **fields):
+        # Simulates a write that committed `ago` before the last run's mark
+        watermark = RollupWatermark.objects.get(name=stats.WATERMARK).value
+        Provider.objects.filter(pk=provider.pk).update(
+            updated_at=watermark - ago, **fields
+        )
+
+    def test_p95(self):
+        self.assertIsNone(stats.p95([]))
+        self.assertEqual(stats.p95([7.0]), 7.0)
+        self.assertEqual(stats.p95([float(i) for i in range(20, 0, -1)]), 19.0)
+        self.assertEqual(stats.p95([float(i) for i in range(1, 101)]), 95.0)
+
+    def test_backfill_hour_and_day_buckets(self):
+        self.provider("aws", "up", 5, duration=60)
+        self.provider("aws", "down", 30, duration=120)
+        self.provider("aws", "in_progress", 70)
+        self.provider("oracle", "up", 15, duration=30)
+
+        # Hours 10:00 and 11:00, plus the day
+        self.assertEqual(stats.backfill(), 3)
+
+        next_hour = self.hour + timedelta(hours=1)
+        self.assertEqual(
+            self.rollups("hour"),
+            {
+                (self.hour, "aws"): (2, 1, 1, 90.0, 120.0),
+                (self.hour, "oracle"): (1, 1, 0, 30.0, 30.0),
+                (next_hour, "aws"): (1, 0, 0, None, None),
+            },
+        )
+        day = self.hour.replace(hour=0)
+        self.assertEqual(
+            self.rollups("day"),
+            {
+                (day, "aws"): (3, 1, 1, 90.0, 120.0),
+                (day, "oracle"): (1, 1, 0, 30.0, 30.0),
+            },
+        )
+
+    def test_refresh_rereads_the_overlap_without_double_counting(self):
+        self.provider("aws", "up", 5, duration=60)
+        late = self.provider("aws", "in_progress", 70)
+        stale = self.provider("oracle", "in_progress", 15)
+        stats.backfill()
+
+        # Inside the 5-minute overlap: picked up again. Outside: left alone
+        finished_at = self.hour + timedelta(minutes=80)
+        self.changed(late, timedelta(minutes=2), status="up", finished_at=finished_at)
+        self.changed(stale, timedelta(minutes=10), status="down")
+        for _ in range(2):
+            stats.refresh_rollups()
+
+        next_hour = self.hour + timedelta(hours=1)
+        day = self.hour.replace(hour=0)
+        self.assertEqual(
+            self.rollups("hour")[(next_hour, "aws")], (1, 1, 0, 600.0, 600.0)
+        )
+        self.assertEqual(self.rollups("day")[(day, "aws")], (2, 2, 0, 330.0, 600.0))
+        # The day bucket is recomputed whole; the stale hour bucket isn't
+        self.assertEqual(
+            self.rollups("hour")[(self.hour, "oracle")], (1, 0, 0, None, None)
+        )
+        self.assertEqual(DeployStatRollup.objects.count(), 5)
+
+
+class LogSearchViewTests(TestCase):
+    url = "/api/logs/search/"
+
+    def setUp(self):
+        self.deploy = Deploy.objects.create(github_repo_url=REPO_URL)
+        provider = Provider.objects.create(deploy=self.deploy, slug="aws")
+        for message in ("Git clone failed: timeout", "Upload successful"):
+            Log.objects.create(
+                deploy=self.deploy, provider=provider, message=message, level="info"
+            )
+
+    def test_search(self):
+        response = self.client.get(
+            self.url, {"q": "clone failed", "deploy": self.deploy.pk, "limit": 5000}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [log["message"] for log in response.data], ["Git clone failed: timeout"]
+        )
+
+    def test_invalid_parameters(self):
+        cases = [
+            ({"deploy": "abc"}, "deploy"),
+            ({"deploy": "-1"}, "deploy"),
+            ({"deploy": "²"}, "deploy"),
+            ({"deploy": "٣"}, "deploy"),
+            ({"limit": "-1"}, "limit"),
+            ({"limit": "0"}, "limit"),
+            ({"limit": "ten"}, "limit"),
+            ({"since": "yesterday"}, "since"),
+        ]
+        for params, field in cases:
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.data)
+
+
+class TimingOutDeployer(BaseDeployer):
+    """Hits the soft time limit in the cloud step of every attempt."""
+
+    attempts = 0
+
+    def get_provider_type(self):
+        return "aws"
+
+    def clone_repository(self):
+        pass
+
+    def validate_project_structure(self):
+        pass
+
+    def deploy_to_cloud(self):
+        TimingOutDeployer.attempts += 1
+        raise SoftTimeLimitExceeded()
+
+
+class DeployTimeLimitTests(TestCase):
+    def setUp(self):
+        TimingOutDeployer.attempts = 0
+        self.deploy = Deploy.objects.create(github_repo_url=REPO_URL)
+        self.provider = Provider.objects.create(
+            deploy=self.deploy, slug="aws", status="in_progress"
+        )
+
+    def test_timeout_leaves_provider_in_progress(self):
+        deployer = TimingOutDeployer(self.deploy)
+        with self.assertRaises(SoftTimeLimitExceeded):
+            deployer.execute_deployment()
+        self.provider.refresh_from_db()
+        self.assertEqual(self.provider.status, "in_progress")
+        self.assertIsNone(self.provider.finished_at)
+        self.assertFalse(Log.objects.filter(level="error").exists())
+
+    def test_steps_left_running_do_not_touch_the_checkpoint(self):
+        deployer = TimingOutDeployer(self.deploy)
+        with self.assertRaises(SoftTimeLimitExceeded):
+            deployer.execute_deployment()
+        # A step that outlived the attempt finishes while the retry runs
+        deployer.save_checkpoint(artifact_key="stale")
+        self.provider.refresh_from_db()
+        self.assertNotIn("artifact_key", self.provider.checkpoint)
+
+    @mock.patch.dict(
+        os.environ, {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test"}
+    )
+    def test_upload_skipped_on_retry_is_removed_on_cancel(self):
+        deployer = AWSDeployer(self.deploy)
+        deployer.provider = self.provider
+        build_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(build_dir.cleanup)
+        zip_path = Path(build_dir.name) / "app.zip"
+        zip_path.write_bytes(b"PK")
+        key = f"{self.deploy.pk}/app.zip"
+        deployer.checkpoint = {
+            "artifact_key": key,
+            "artifact_sha256": file_digest(zip_path),
+        }
+
+        s3 = deployer.s3_client
+        with mock.patch.object(s3, "upload_file") as upload_file, mock.patch.object(
+            s3, "delete_objects"
+        ) as delete_objects:
+            deployer._upload_to_s3(zip_path, key)
+            deployer.discard_uploads()
+
+        upload_file.assert_not_called()
+        delete_objects.assert_called_once_with(
+            Bucket=deployer.bucket, Delete={"Objects": [{"Key": key}]}
+        )
+
+    @mock.patch(
+        "deployments.deployers.factory.get_deployer_class",
+        return_value=TimingOutDeployer,
+    )
+    def test_provider_is_down_once_retries_run_out(self, get_deployer_class):
+        statuses = []
+        retry = deploy_to_provider_task.retry
+
+        def record_status(*args, **kwargs):
+            statuses.append(Provider.objects.get(pk=self.provider.pk).status)
+            return retry(*args, **kwargs)
+
+        with mock.patch.object(
+            deploy_to_provider_task, "max_retries", 2
+        ), mock.patch.object(
+            deploy_to_provider_task, "retry", side_effect=record_status
+        ):
+            result = deploy_to_provider_task.apply(args=(self.deploy.pk, "aws"))
+
+        self.assertEqual(result.get(), f"Deploy {self.deploy.pk} timed out on aws")
+        self.assertEqual(TimingOutDeployer.attempts, 3)
+        self.assertEqual(statuses, ["in_progress", "in_progress"])
+        self.provider.refresh_from_db()
+        self.assertEqual(self.provider.status, "down")
+        self.assertIsNotNone(self.provider.finished_at)
+        self.assertTrue(
+            Log.objects.filter(
+                level="error", message="Deployment timed out after 3 attempts"
+            ).exists()
+        )
+
+
+class FailingDeployer(TimingOutDeployer):
+    def deploy_to_cloud(self):
+        raise RuntimeError("stack rejected")
+
+
+class ChattyDeployer(TimingOutDeployer):
+    fails = False
+
+    def deploy_to_cloud(self):
+        for i in range(5):
+            self.log(f"detail {i}", "debug")
+        if self.fails:
+            raise RuntimeError("stack rejected")
+
+
+@mock.patch.dict(
+    os.environ, {"DEPLOY_LOG_PERSIST_LEVEL": "info", "DEPLOY_LOG_BUFFER_SIZE": "3"}
+)
+class DeployLogBufferTests(TestCase):
+    def setUp(self):
+        self.deploy = Deploy.objects.create(github_repo_url=REPO_URL)
+        Provider.objects.create(deploy=self.deploy, slug="aws")
+
+    def messages(self):
+        return list(
+            Log.objects.order_by("timestamp", "pk").values_list("message", "level")
+        )
+
+    def test_lines_below_the_persist_level_are_dropped_on_success(self):
+        ChattyDeployer(self.deploy).execute_deployment()
+        self.assertEqual(self.messages(), [("Starting deployment process", "info")])
+
+    def test_buffered_lines_are_written_on_failure(self):
+        deployer = ChattyDeployer(self.deploy)
+        deployer.fails = True
+        with self.assertRaises(RuntimeError):
+            deployer.execute_deployment()
+        # Only the last DEPLOY_LOG_BUFFER_SIZE lines are kept, with the time
+        # they were emitted, so they sort before the error
+        self.assertEqual(
+            self.messages(),
+            [
+                ("Starting deployment process", "info"),
+                ("detail 2", "debug"),
+                ("detail 3", "debug"),
+                ("detail 4", "debug"),
+                ("Deployment failed: stack rejected", "error"),
+            ],
+        )
+
+
+@mock.patch("deployments.deployers.factory.get_deployer_class")
+class DeployTaskFailureTests(TestCase):
+    def setUp(self):
+        self.deploy = Deploy.objects.create(github_repo_url=REPO_URL)
+        self.provider = Provider.objects.create(
+            deploy=self.deploy, slug="aws", status="in_progress"
+        )
+
+    def run_task(self):
+        result = deploy_to_provider_task.apply(args=(self.deploy.pk, "aws"))
+        self.provider.refresh_from_db()
+        return result.get()
+
+    def assertFailedWith(self, message):
+        self.assertEqual(self.provider.status, "down")
+        self.assertIsNotNone(self.provider.finished_at)
+        errors = Log.objects.filter(provider=self.provider, level="error")
+        self.assertEqual([log.message for log in errors], [message])
+
+    @mock.patch.dict(os.environ, {"DEPLOY_UPLOAD_MODE": "rsync"})
+    def test_invalid_deployer_configuration(self, get_deployer_class):
+        get_deployer_class.return_value = TimingOutDeployer
+        self.assertIn("Unknown upload mode", self.run_task())
+        self.assertFailedWith("Deployment failed: Unknown upload mode: rsync")
+
+    def test_unknown_deployer(self, get_deployer_class):
+        get_deployer_class.side_effect = ImportError("No module named 'gcp'")
+        self.run_task()
+        self.assertFailedWith("Deployment failed: No module named 'gcp'")
+
+    @mock.patch(
+        "deployments.tasks.acquire_deploy_slot",
+        side_effect=ValueError("Redis URL must specify one of the schemes"),
+    )
+    def test_limits_backend_error(self, acquire_deploy_slot, get_deployer_class):
+        get_deployer_class.return_value = TimingOutDeployer
+        self.run_task()
+        self.assertFailedWith(
+            "Deployment failed: Redis URL must specify one of the schemes"
+        )
+
+    def test_deployment_failure_is_logged_once(self, get_deployer_class):
+        get_deployer_class.return_value = FailingDeployer
+        self.run_task()
+        self.assertFailedWith("Deployment failed: stack rejected")
+
+
+class SucceedingDeployer(TimingOutDeployer):
+    def deploy_to_cloud(self):
+        TimingOutDeployer.attempts += 1
+
+
+@mock.patch(
+    "deployments.deployers.factory.get_deployer_class",
+    return_value=SucceedingDeployer,
+)
+class DeployRedeliveryTests(TestCase):
+    def setUp(self):
+        TimingOutDeployer.attempts = 0
+        self.deploy = Deploy.objects.create(github_repo_url=REPO_URL)
+        self.provider = Provider.objects.create(
+            deploy=self.deploy, slug="aws", status="in_progress"
+        )
+
+    def deliver(self, redelivered):
+        deploy_to_provider_task.push_request(
+            retries=0, delivery_info={"redelivered": redelivered}
+        )
+        try:
+            result = deploy_to_provider_task.run(self.deploy.pk, "aws")
+        finally:
+            deploy_to_provider_task.pop_request()
+        self.provider.refresh_from_db()
+        return result
+
+    def test_redeliveries_are_counted(self, get_deployer_class):
+        self.deliver(redelivered=False)
+        self.assertEqual(self.provider.redeliveries, 0)
+        self.deliver(redelivered=True)
+        self.assertEqual(self.provider.redeliveries, 1)
+        self.assertEqual(self.provider.status, "up")
+        self.assertEqual(TimingOutDeployer.attempts, 2)
+
+    def test_provider_is_down_once_redeliveries_run_out(self, get_deployer_class):
+        max_retries = deploy_to_provider_task.max_retries
+        self.provider.redeliveries = max_retries
+        self.provider.save()
+
+        result = self.deliver(redelivered=True)
+
+        self.assertEqual(
+            result,
+            f"Deploy {self.deploy.pk} abandoned on aws after "
+            f"{max_retries + 1} redeliveries",
+        )
+        self.assertEqual(TimingOutDeployer.attempts, 0)
+        self.assertEqual(self.provider.status, "down")
+        self.assertIsNotNone(self.provider.finished_at)
+        self.assertEqual(
+            list(Log.objects.filter(level="error").values_list("message", flat=True)),
+            [f"Worker lost {max_retries + 1} times during deployment"],
+        )
+
+
+# Steps write checkpoints from pool threads, and concurrent writes to the
+# in-memory SQLite test database fail with "table is locked"; the step order
+# doesn't depend on the pool size
+@mock.patch.dict(os.environ, {"DEPLOY_PIPELINE_WORKERS": "1"})
+class OracleDeployerTests(TransactionTestCase):
+    def setUp(self):
+        deploy = Deploy.objects.create(github_repo_url=REPO_URL)
+        self.deployer = OracleDeployer(deploy)
+        self.deployer.provider = Provider.objects.create(deploy=deploy, slug="oracle")
+        self.deployer.temp_dir = tempfile.mkdtemp()
+        self.deployer.build_dir = tempfile.mkdtemp()
+        self.addCleanup(self.deployer.cleanup)
+        Path(self.deployer.temp_dir, "docker-compose.yml").write_text("services: {}\n")
+        FakeResourceManagerClient.stacks = []
+
+    def test_stack_waits_for_the_upload(self):
+        with stubbed_oci(), mock.patch.object(
+            FakeObjectStorageClient, "put_object", side_effect=OSError("reset")
+        ):
+            with self.assertRaisesMessage(OSError, "reset"):
+                self.deployer.deploy_to_cloud()
+        self.assertEqual(FakeResourceManagerClient.stacks, [])
+
+        with stubbed_oci():
+            self.deployer.deploy_to_cloud()
+        self.assertEqual(len(FakeResourceManagerClient.stacks), 1)
+
+
+class CeleryQueueCollectorTests(SimpleTestCase):
+    def collect(self):
+        connection = mock.MagicMock()
+        depths = {"celery": 1, "deploy.aws": 7}
+
+        def queue_declare(queue, passive):
+            if queue not in depths:
+                raise KeyError(queue)
+            return queue, depths[queue], 0
+
+        channel = connection.__enter__.return_value.default_channel
+        channel.queue_declare.side_effect = queue_declare
+        with mock.patch("core.celery.app.connection_for_read", return_value=connection):
+            (gauge,) = CeleryQueueCollector().collect()
+        return {sample.labels["queue"]: sample.value for sample in gauge.samples}
+
+    def test_reports_provider_queues(self):
+        self.assertEqual(
+            self.collect(), {"celery": 1, "deploy.aws": 7, "deploy.oracle": 0}
+        )
+
+    @override_settings(DEPLOY_PROVIDER_QUEUES=False)
+    def test_default_queue_only(self):
+        self.assertEqual(self.collect(), {"celery": 1})
+
+
+class BenchmarkTests(TestCase):
+    @mock.patch("deployments.benchmarks.runner.DeployerFactory.create_deployer")
+    def test_failed_deploys_are_left_out_of_the_timings(self, create_deployer):
+        outcomes = iter([RuntimeError("stack rejected"), None])
+
+        def deployer(provider_slug, deploy):
+            deployer = mock.Mock(phase_timings={"clone": 1.0})
+            deployer.execute_deployment.side_effect = next(outcomes)
+            return deployer
+
+        create_deployer.side_effect = deployer
+        with tempfile.TemporaryDirectory() as workdir, mock.patch.dict(
+            STUBS, {"aws": nullcontext}
+        ):
+            result = run_provider("aws", REPO_URL, 2, Path(workdir))
+
+        self.assertEqual(result["errors"], ["stack rejected"])
+        self.assertEqual(result["phases"]["clone"]["max"], 1.0)
+        self.assertEqual(set(result["phases"]), {"clone", "total"})
+
+    def test_mismatched_params(self):
+        params = {"iterations": 5, "files": 200, "upload_mode": "archive"}
+        baseline = {"params": params}
+        self.assertEqual(mismatched_params({"params": dict(params)}, baseline), [])
+        self.assertEqual(
+            mismatched_params(
+                {"params": {**params, "files": 2000, "upload_mode": "delta"}},
+                baseline,
+            ),
+            ["files: 200 -> 2000", "upload_mode: 'archive' -> 'delta'"],
+        )
+
+
+class BotocoreBackoffTests(SimpleTestCase):
+    def test_retries_follow_the_policy(self):
+        policy = BackoffPolicy(max_attempts=4, base=1, cap=2)
+        client = boto3.client(
+            "s3",
+            region_name="us-east-1",
+            aws_access_key_id="test",
+            aws_secret_access_key="test",
+            config=policy.botocore_config(),
+        )
+        policy.install_botocore_retries(client)
+
+        class Body:
+            def stream(self, **kwargs):
+                yield b""
+
+        attempts = []
+
+        def unavailable(request, **kwargs):
+            attempts.append(request)
+            return AWSResponse(request.url, 503, {}, Body())
+
+        client.meta.events.register("before-send", unavailable)
+        with mock.patch(
+            "deployments.deployers.backoff.random.uniform", side_effect=lambda a, b: b
+        ), mock.patch("botocore.endpoint.time.sleep") as sleep:
+            with self.assertRaises(ClientError):
+                client.list_buckets()
+
+        self.assertEqual(len(attempts), 4)
+        # Upper bound of the full-jitter delay: base * 2**attempt, capped
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 2, 2])
+
+
+def observed_seconds(histogram, labels) -> float:
+    for metric in histogram.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_sum") and sample.labels == labels:
+                return sample.value
+    return 0.0
+
+
+@mock.patch.dict(
+    os.environ, {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test"}
+)
+class AWSClientHooksTests(SimpleTestCase):
+    def test_throttle_wait_is_not_timed_as_api_latency(self):
+        deployer = AWSDeployer(Deploy(pk=1))
+
+        class Body:
+            def stream(self, **kwargs):
+                yield b"<ListAllMyBucketsResult/>"
+
+        deployer.s3_client.meta.events.register(
+            "before-send",
+            lambda request, **kwargs: AWSResponse(request.url, 200, {}, Body()),
+        )
+        labels = {
+            "provider": "aws",
+            "service": "s3",
+            "operation": "ListBuckets",
+            "outcome": "ok",
+        }
+        before = observed_seconds(CLOUD_API_CALL_DURATION, labels)
+        with mock.patch(
+            "deployments.deployers.base.throttle_api_call",
+            side_effect=lambda *args: time.sleep(0.2),
+        ) as throttle:
+            deployer.s3_client.list_buckets()
+
+        throttle.assert_called_once()
+        elapsed = observed_seconds(CLOUD_API_CALL_DURATION, labels) - before
+        self.assertGreater(elapsed, 0)
+        self.assertLess(elapsed, 0.2)
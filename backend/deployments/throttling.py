@@ -0,0 +1,126 @@
+"""
+Limites de concorrência e de taxa por provider e por conta de cloud.
+
+Os limites são compartilhados entre todos os workers via Redis:
+
+- concorrência: um semáforo (sorted set de leases com validade). Um worker que
+  morre sem liberar o slot não o segura para sempre, o lease expira junto com
+  o time limit da task;
+- taxa de chamadas às APIs: um token bucket por chave, reabastecido a
+  `rate` tokens por segundo, com rajadas de até um segundo de tokens.
+
+Limite 0 desliga a verificação (e o acesso ao Redis), que é o padrão.
+"""
+
+import hashlib
+import time
+import uuid
+from functools import cache
+
+from django.conf import settings
+
+KEY_PREFIX = "deploy-limits"
+
+ACQUIRE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2])))
+return 1
+"""
+
+TAKE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = math.max(1, rate)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+
+@cache
+def _redis():
+    import redis
+
+    return redis.Redis.from_url(settings.DEPLOY_LIMITS_REDIS_URL)
+
+
+@cache
+def _script(source: str):
+    return _redis().register_script(source)
+
+
+def account_key(*parts) -> str:
+    """Identificador estável da conta, sem expor credenciais nas chaves do Redis."""
+    return hashlib.sha256(":".join(map(str, parts)).encode()).hexdigest()[:16]
+
+
+def _limits(provider: str) -> dict:
+    return settings.DEPLOY_PROVIDER_LIMITS.get(provider, {})
+
+
+class DeploySlot:
+    """Slots de concorrência de um deploy (provider e conta), liberados juntos."""
+
+    def __init__(self, keys: list[str], token: str):
+        self.keys = keys
+        self.token = token
+
+    def release(self):
+        for key in self.keys:
+            _redis().zrem(key, self.token)
+
+
+def acquire_deploy_slot(provider: str, account: str) -> DeploySlot | None:
+    """
+    Reserva um slot no provider e na conta. Retorna None se algum dos dois
+    estiver no limite; nesse caso nada fica reservado.
+    """
+    limits = [
+        (f"{KEY_PREFIX}:slots:{provider}", _limits(provider).get("concurrency", 0)),
+        (
+            f"{KEY_PREFIX}:slots:{provider}:{account}",
+            settings.DEPLOY_ACCOUNT_CONCURRENCY,
+        ),
+    ]
+    slot = DeploySlot([], uuid.uuid4().hex)
+    for key, limit in limits:
+        if not limit:
+            continue
+        # O lease dura o mesmo que o time limit da task
+        if not _script(ACQUIRE_SCRIPT)(
+            keys=[key], args=[limit, settings.CELERY_TASK_TIME_LIMIT, slot.token]
+        ):
+            slot.release()
+            return None
+        slot.keys.append(key)
+    return slot
+
+
+def throttle_api_call(provider: str, account: str):
+    """Bloqueia até haver token para mais uma chamada à API da cloud."""
+    buckets = [
+        (f"{KEY_PREFIX}:api:{provider}", _limits(provider).get("api_rate", 0)),
+        (f"{KEY_PREFIX}:api:{provider}:{account}", settings.DEPLOY_ACCOUNT_API_RATE),
+    ]
+    for key, rate in buckets:
+        if not rate:
+            continue
+        while wait := float(_script(TAKE_SCRIPT)(keys=[key], args=[rate])):
+            time.sleep(wait)
@@ -1,3 +1,11 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-# Create your views here.
+from deployments.metrics import build_registry
+
+
+def metrics_view(request):
+    """Exposição das métricas no formato do Prometheus."""
+    return HttpResponse(
+        generate_latest(build_registry()), content_type=CONTENT_TYPE_LATEST
+    )